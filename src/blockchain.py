@@ -1,95 +1,155 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, request
+import argparse
 import hashlib
+import hmac
 import json
+import orjson
+import threading
 import time
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Union
 
 app = Flask(__name__)
 
 
+def ojsonify(obj) -> Response:
+    """使用 orjson 序列化 JSON 响应（替代 flask.jsonify）"""
+    return app.response_class(orjson.dumps(obj), mimetype='application/json')
+
+
 # ==================== Merkle Tree Implementation ====================
 
 class MerkleTree:
     """实现Merkle树用于SPV验证"""
     
     @staticmethod
-    def hash_transaction(tx: Dict) -> str:
-        """计算交易的哈希值"""
+    def hash_transaction(tx: Dict) -> bytes:
+        """
+        计算交易的哈希值（32字节原始摘要）
+        {"u": str, "v": str} 形式的交易使用定长前缀的规范字节编码:
+            len(u) || u || len(v) || v   (长度为4字节大端)
+        其他形式的交易回退到 JSON 编码
+        """
+        if len(tx) == 2 and isinstance(tx.get("u"), str) and isinstance(tx.get("v"), str):
+            return MerkleTree.hash_uv(tx["u"], tx["v"])
+
         tx_string = json.dumps(tx, sort_keys=True)
-        return hashlib.sha256(tx_string.encode()).hexdigest()
+        return hashlib.sha256(tx_string.encode()).digest()
+    
+    @staticmethod
+    def hash_uv(u: str, v: str) -> bytes:
+        """直接由 u、v 字符串计算 {"u": u, "v": v} 交易的哈希值（规范字节编码）"""
+        u_bytes = u.encode()
+        v_bytes = v.encode()
+        data = b"".join((len(u_bytes).to_bytes(4, 'big'), u_bytes, len(v_bytes).to_bytes(4, 'big'), v_bytes))
+        return hashlib.sha256(data).digest()
     
     @staticmethod
-    def hash_pair(left: str, right: str) -> str:
+    def hash_pair(left: bytes, right: bytes) -> bytes:
         """计算两个哈希值的组合哈希"""
-        return hashlib.sha256((left + right).encode()).hexdigest()
+        return hashlib.sha256(left + right).digest()
+    
+    @staticmethod
+    def hash_level(level: List[bytes]) -> List[bytes]:
+        """
+        批量计算一层节点的所有父节点哈希
+        level 必须已补齐为偶数个节点（见 build_tree）
+        """
+        # 整层一次性两两配对，避免逐节点的方法调用开销
+        sha256 = hashlib.sha256
+        return [sha256(left + right).digest()
+                for left, right in zip(level[0::2], level[1::2])]
     
     @classmethod
-    def build_merkle_root(cls, transactions: List[Dict]) -> str:
-        """构建Merkle树并返回根哈希"""
-        if not transactions:
-            return hashlib.sha256(b"").hexdigest()
-        
+    def build_tree(cls, transactions: List[Dict]) -> List[List[bytes]]:
+        """
+        构建完整的Merkle树
+        返回: 自底向上的各层节点哈希（原始字节），levels[0] 为叶子层，levels[-1] 为 [根哈希]
+        除根层外，奇数个节点的层在构建时补齐一次（复制最后一个节点），
+        之后计算父节点和提取证明路径都无需再处理奇数边界
+        """
         # 计算所有交易的哈希作为叶子节点
-        current_level = [cls.hash_transaction(tx) for tx in transactions]
+        return cls.build_tree_from_leaves([cls.hash_transaction(tx) for tx in transactions])
+    
+    @classmethod
+    def build_tree_soa(cls, us: List[str], vs: List[str]) -> List[List[bytes]]:
+        """
+        由并列的 u、v 字符串数组构建Merkle树，
+        与 build_tree([{"u": u, "v": v}, ...]) 结果相同，但无需逐笔构造交易字典
+        """
+        hash_uv = cls.hash_uv
+        return cls.build_tree_from_leaves([hash_uv(u, v) for u, v in zip(us, vs)])
+    
+    @classmethod
+    def build_tree_from_leaves(cls, leaves: List[bytes]) -> List[List[bytes]]:
+        """由叶子节点哈希构建Merkle树的所有层"""
+        if not leaves:
+            return [[hashlib.sha256(b"").digest()]]
+        
+        current_level = leaves
+        levels = [current_level]
         
         # 自底向上构建Merkle树
         while len(current_level) > 1:
-            next_level = []
-            
-            # 两两配对计算父节点哈希
-            for i in range(0, len(current_level), 2):
-                left = current_level[i]
-                # 如果是奇数个节点，复制最后一个
-                right = current_level[i + 1] if i + 1 < len(current_level) else left
-                next_level.append(cls.hash_pair(left, right))
-            
-            current_level = next_level
+            # 如果是奇数个节点，复制最后一个
+            if len(current_level) % 2 == 1:
+                current_level.append(current_level[-1])
+            current_level = cls.hash_level(current_level)
+            levels.append(current_level)
         
-        return current_level[0]
+        return levels
     
     @classmethod
-    def get_merkle_proof(cls, transactions: List[Dict], tx_index: int) -> List[Dict]:
+    def build_merkle_root(cls, transactions: List[Dict]) -> str:
+        """构建Merkle树并返回根哈希（十六进制）"""
+        return cls.build_tree(transactions)[-1][0].hex()
+    
+    @staticmethod
+    def get_proof_from_levels(levels: List[List[bytes]], tx_index: int) -> List[Dict]:
         """
-        获取指定交易的Merkle证明路径
-        返回: [{"hash": str, "position": "left"/"right"}]
+        基于已构建的Merkle树各层节点获取交易的证明路径，每层只需读取一个兄弟节点
+        返回: [{"hash": str (十六进制), "position": "left"/"right"}]
         """
-        if tx_index < 0 or tx_index >= len(transactions):
+        if tx_index < 0 or tx_index >= len(levels[0]):
             return []
         
-        # 计算所有交易的哈希作为叶子节点
-        current_level = [cls.hash_transaction(tx) for tx in transactions]
         proof = []
         current_index = tx_index
         
-        # 自底向上构建证明路径
-        while len(current_level) > 1:
-            next_level = []
-            
-            for i in range(0, len(current_level), 2):
-                left = current_level[i]
-                right = current_level[i + 1] if i + 1 < len(current_level) else left
-                
-                # 如果当前索引在这对节点中，记录兄弟节点
-                if i == current_index:
-                    proof.append({"hash": right, "position": "right"})
-                    current_index = i // 2
-                elif i + 1 == current_index:
-                    proof.append({"hash": left, "position": "left"})
-                    current_index = i // 2
-                
-                next_level.append(cls.hash_pair(left, right))
-            
-            current_level = next_level
+        # 逐层记录兄弟节点（最顶层为根，无需记录）；各层已补齐，兄弟节点总是 index ^ 1
+        for level in levels[:-1]:
+            position = "left" if current_index & 1 else "right"
+            proof.append({"hash": level[current_index ^ 1].hex(), "position": position})
+            current_index >>= 1
         
         return proof
     
     @classmethod
-    def verify_proof(cls, tx: Dict, merkle_root: str, proof: List[Dict]) -> bool:
-        """验证Merkle证明是否有效"""
+    def get_merkle_proof(cls, transactions: List[Dict], tx_index: int) -> List[Dict]:
+        """
+        获取指定交易的Merkle证明路径
+        返回: [{"hash": str (十六进制), "position": "left"/"right"}]
+        """
+        if tx_index < 0 or tx_index >= len(transactions):
+            return []
+        
+        return cls.get_proof_from_levels(cls.build_tree(transactions), tx_index)
+    
+    @classmethod
+    def verify_proof(cls, tx: Dict, merkle_root: Union[str, bytes], proof: List[Dict]) -> bool:
+        """
+        验证Merkle证明是否有效
+        merkle_root 与证明路径中的哈希既可以是十六进制字符串，也可以是原始字节；
+        十六进制格式错误时视为证明无效，返回 False
+        """
         current_hash = cls.hash_transaction(tx)
         
         for proof_element in proof:
             sibling_hash = proof_element["hash"]
+            if isinstance(sibling_hash, str):
+                try:
+                    sibling_hash = bytes.fromhex(sibling_hash)
+                except ValueError:
+                    return False
             position = proof_element["position"]
             
             if position == "left":
@@ -97,7 +157,13 @@ class MerkleTree:
             else:
                 current_hash = cls.hash_pair(current_hash, sibling_hash)
         
-        return current_hash == merkle_root
+        if isinstance(merkle_root, str):
+            try:
+                merkle_root = bytes.fromhex(merkle_root)
+            except ValueError:
+                return False
+        # 常数时间比较（单次 C 层比较，且不泄露时序信息）
+        return hmac.compare_digest(current_hash, merkle_root)
 
 
 # ==================== Blockchain Implementation ====================
@@ -105,29 +171,47 @@ class MerkleTree:
 class Block:
     """区块类"""
     
-    def __init__(self, height: int, prev_hash: str, transactions: List[Dict], timestamp: float = None):
+    def __init__(self, height: int, prev_hash: str, transactions: List[Dict], timestamp: float = None,
+                 merkle_levels: Optional[List[List[bytes]]] = None):
         self.height = height
         self.prev_hash = prev_hash
         self.transactions = transactions
         self.timestamp = timestamp or time.time()
-        self.merkle_root = MerkleTree.build_merkle_root(transactions)
+        # 保存Merkle树的所有层，SPV证明直接读取，无需重新构建
+        # （调用方已按同样的交易构建好Merkle树时可直接传入）
+        self.merkle_levels = merkle_levels if merkle_levels is not None else MerkleTree.build_tree(transactions)
+        self.merkle_root = self.merkle_levels[-1][0].hex()
+        # (u, v) -> 交易索引，重复交易保留第一次出现的位置
+        self.tx_index: Dict[Tuple[str, str], int] = {}
+        for i, tx in enumerate(transactions):
+            self.tx_index.setdefault((tx["u"], tx["v"]), i)
+        # 区块打包后不可变，哈希在首次计算后缓存
+        self._hash: Optional[str] = None
+        # 区块字典同样只构建一次，/chain 等接口直接复用（调用方不应修改返回值）
+        self._dict_cache: Dict = {
+            "header": self._header_dict(),
+            "transactions": self.transactions
+        }
     
-    def to_dict(self) -> Dict:
-        """转换为字典格式"""
+    def _header_dict(self) -> Dict:
+        """区块头字典"""
         return {
-            "header": {
-                "height": self.height,
-                "prev_hash": self.prev_hash,
-                "merkle_root": self.merkle_root,
-                "timestamp": self.timestamp
-            },
-            "transactions": self.transactions
+            "height": self.height,
+            "prev_hash": self.prev_hash,
+            "merkle_root": self.merkle_root,
+            "timestamp": self.timestamp
         }
     
+    def to_dict(self) -> Dict:
+        """转换为字典格式（返回打包时缓存的字典）"""
+        return self._dict_cache
+    
     def hash(self) -> str:
-        """计算区块哈希"""
-        header_string = json.dumps(self.to_dict()["header"], sort_keys=True)
-        return hashlib.sha256(header_string.encode()).hexdigest()
+        """计算区块哈希（首次计算后缓存，仅序列化区块头）"""
+        if self._hash is None:
+            header_string = json.dumps(self._header_dict(), sort_keys=True)
+            self._hash = hashlib.sha256(header_string.encode()).hexdigest()
+        return self._hash
 
 
 class Blockchain:
@@ -135,9 +219,18 @@ class Blockchain:
     
     def __init__(self):
         self.chain: List[Block] = []
-        self.pending_transactions: List[Dict] = []
+        # 缓冲区按列存储 u、v，打包时直接批量计算叶子哈希
+        self._pending_u: List[str] = []
+        self._pending_v: List[str] = []
+        # 多线程服务下保护缓冲区与链的修改（打包时的拷贝与清空必须是原子的）
+        self._lock = threading.Lock()
         self.create_genesis_block()
     
+    @property
+    def pending_transactions(self) -> List[Dict]:
+        """缓冲区中的交易（字典形式的只读快照）"""
+        return [{"u": u, "v": v} for u, v in zip(self._pending_u, self._pending_v)]
+    
     def create_genesis_block(self):
         """创建创世区块"""
         genesis_tx = {"u": "genesis", "v": "genesis"}
@@ -153,36 +246,43 @@ class Blockchain:
     def add_transaction(self, u: str, v: str) -> Dict:
         """添加交易到缓冲区"""
         transaction = {"u": u, "v": v}
-        self.pending_transactions.append(transaction)
+        with self._lock:
+            self._pending_u.append(u)
+            self._pending_v.append(v)
+            pending_count = len(self._pending_u)
         return {
             "message": "交易已添加到缓冲区",
             "transaction": transaction,
-            "pending_count": len(self.pending_transactions)
+            "pending_count": pending_count
         }
     
     def mine_block(self) -> Dict:
         """
         打包区块：将缓冲区中的所有交易打包成新区块
         """
-        if not self.pending_transactions:
-            return {"message": "缓冲区为空，无法生成区块"}
-        
-        # 获取最后一个区块
-        last_block = self.chain[-1]
-        
-        # 创建新区块
-        new_block = Block(
-            height=last_block.height + 1,
-            prev_hash=last_block.hash(),
-            transactions=self.pending_transactions.copy()
-        )
-        
-        # 添加到链中
-        self.chain.append(new_block)
-        
-        # 清空缓冲区
-        tx_count = len(self.pending_transactions)
-        self.pending_transactions.clear()
+        with self._lock:
+            if not self._pending_u:
+                return {"message": "缓冲区为空，无法生成区块"}
+            
+            # 获取最后一个区块
+            last_block = self.chain[-1]
+            
+            # 创建新区块（Merkle树直接由 u、v 数组构建）
+            us, vs = self._pending_u, self._pending_v
+            new_block = Block(
+                height=last_block.height + 1,
+                prev_hash=last_block.hash(),
+                transactions=[{"u": u, "v": v} for u, v in zip(us, vs)],
+                merkle_levels=MerkleTree.build_tree_soa(us, vs)
+            )
+            
+            # 添加到链中
+            self.chain.append(new_block)
+            
+            # 清空缓冲区
+            tx_count = len(us)
+            self._pending_u = []
+            self._pending_v = []
         
         return {
             "message": "区块生成成功",
@@ -204,18 +304,14 @@ class Blockchain:
         transaction = {"u": u, "v": v}
         
         # 查找交易在区块中的索引
-        tx_index = None
-        for i, tx in enumerate(block.transactions):
-            if tx["u"] == u and tx["v"] == v:
-                tx_index = i
-                break
+        tx_index = block.tx_index.get((u, v))
         
         # 如果交易不存在，返回None
         if tx_index is None:
             return None
         
         # 生成Merkle证明
-        merkle_proof = MerkleTree.get_merkle_proof(block.transactions, tx_index)
+        merkle_proof = MerkleTree.get_proof_from_levels(block.merkle_levels, tx_index)
         
         return {
             "transaction": transaction,
@@ -234,7 +330,7 @@ class Blockchain:
         """获取区块链信息"""
         return {
             "chain_length": len(self.chain),
-            "pending_transactions": len(self.pending_transactions),
+            "pending_transactions": len(self._pending_u),
             "latest_block_hash": self.chain[-1].hash() if self.chain else None
         }
 
@@ -255,7 +351,7 @@ def new_transaction():
     
     # 验证输入
     if not data or 'u' not in data or 'v' not in data:
-        return jsonify({
+        return ojsonify({
             "error": "无效的输入格式，需要包含 'u' 和 'v' 字段"
         }), 400
     
@@ -263,7 +359,7 @@ def new_transaction():
     v = str(data['v'])
     
     result = blockchain.add_transaction(u, v)
-    return jsonify(result), 201
+    return ojsonify(result), 201
 
 
 @app.route('/block/mine', methods=['POST'])
@@ -275,9 +371,9 @@ def mine_block():
     result = blockchain.mine_block()
     
     if "error" in result or "无法" in result.get("message", ""):
-        return jsonify(result), 400
+        return ojsonify(result), 400
     
-    return jsonify(result), 201
+    return ojsonify(result), 201
 
 
 @app.route('/transaction/verify', methods=['GET'])
@@ -291,19 +387,19 @@ def verify_transaction():
         u = str(request.args.get('u'))
         v = str(request.args.get('v'))
     except (TypeError, ValueError):
-        return jsonify({
+        return ojsonify({
             "error": "参数错误，需要提供 block_height (int), u (str), v (str)"
         }), 400
     
     proof = blockchain.get_spv_proof(block_height, u, v)
     
     if proof is None:
-        return jsonify({
+        return ojsonify({
             "message": "交易不存在",
             "exists": False
         }), 404
     
-    return jsonify({
+    return ojsonify({
         "message": "交易存在",
         "exists": True,
         "spv_proof": proof
@@ -315,7 +411,7 @@ def get_chain():
     """
     获取完整区块链（用于调试和查看）
     """
-    return jsonify({
+    return ojsonify({
         "chain": blockchain.get_chain(),
         "info": blockchain.get_chain_info()
     }), 200
@@ -326,7 +422,7 @@ def get_info():
     """
     获取区块链基本信息
     """
-    return jsonify(blockchain.get_chain_info()), 200
+    return ojsonify(blockchain.get_chain_info()), 200
 
 
 @app.route('/', methods=['GET'])
@@ -334,7 +430,7 @@ def index():
     """
     API根路径，返回可用端点
     """
-    return jsonify({
+    return ojsonify({
         "message": "区块链API服务",
         "endpoints": {
             "POST /transaction/new": "提交新交易 {u: str, v: str}",
@@ -349,7 +445,17 @@ def index():
 # ==================== Main Entry ====================
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='区块链服务')
+    parser.add_argument('--port', type=int, default=5001, help='服务端口（默认: 5001）')
+    parser.add_argument('--debug', action='store_true', help='使用 Flask 开发服务器（调试模式）')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("区块链服务启动中...")
     print("=" * 60)
-    app.run(debug=True, host='0.0.0.0', port=5001)
+
+    if args.debug:
+        app.run(debug=True, host='0.0.0.0', port=args.port)
+    else:
+        from waitress import serve
+        serve(app, host='0.0.0.0', port=args.port, threads=8)
@@ -1,12 +1,20 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, request
 from charm.toolbox.pairinggroup import PairingGroup, G1, G2, ZR, pair
 import argparse
-from typing import Dict, Optional
+import hashlib
+import orjson
+from functools import lru_cache
+from typing import Dict, List, Optional
 
 app = Flask(__name__)
 
-# 初始化配对群
-group = PairingGroup('MNT224')
+
+def ojsonify(obj) -> Response:
+    """使用 orjson 序列化 JSON 响应（替代 flask.jsonify）"""
+    return app.response_class(orjson.dumps(obj), mimetype='application/json')
+
+# 初始化配对群（BN254: Type-3 非对称配对，比 MNT224 更快；各服务须使用同一曲线）
+group = PairingGroup('BN254')
 
 
 # ==================== Serialization Utilities ====================
@@ -16,6 +24,11 @@ def serialize_element(elem) -> str:
     return group.serialize(elem).decode('utf-8')
 
 
+def serialize_bytes(elem) -> bytes:
+    """将群元素序列化为字节串（不做字符串解码，用于哈希输入）"""
+    return group.serialize(elem)
+
+
 def deserialize_element(s: str):
     """将字符串反序列化为群元素（charm-crypto内部格式）"""
     return group.deserialize(s.encode('utf-8'))
@@ -35,6 +48,20 @@ def serialize_pp(PP: Dict) -> Dict:
     return result
 
 
+def serialize_pp_bytes(PP: Dict) -> Dict:
+    """序列化公共参数，群元素保留为原始字节（用于 msgpack 等二进制传输）"""
+    result = {
+        "g1": serialize_bytes(PP["g1"]),
+        "g2": serialize_bytes(PP["g2"]),
+        "pk": serialize_bytes(PP["pk"]),
+        "n": PP["n"],
+        "hp": serialize_bytes(PP["hp"]),
+    }
+    for i in range(0, PP["n"] + 1):
+        result[f"h{i}"] = serialize_bytes(PP[f"h{i}"])
+    return result
+
+
 def deserialize_pp(data: Dict) -> Dict:
     """反序列化公共参数"""
     result = {
@@ -45,8 +72,61 @@ def deserialize_pp(data: Dict) -> Dict:
         "hp": deserialize_element(data["hp"]),
         "H": group.hash,
     }
-    for i in range(0, data["n"] + 1):
-        result[f"h{i}"] = deserialize_element(data[f"h{i}"])
+    result["h"] = [deserialize_element(data[f"h{i}"]) for i in range(0, data["n"] + 1)]
+    for i, h in enumerate(result["h"]):
+        result[f"h{i}"] = h
+    precompute_fixed_bases([result["g1"]] + result["h"])
+    return result
+
+
+# ==================== Group Arithmetic Utilities ====================
+
+@lru_cache(maxsize=4096)
+def hash_to_zr(value: str):
+    """将属性字符串哈希到 ZR（结果确定，按字符串缓存）"""
+    return group.hash(value, ZR)
+
+
+def hash_challenge(*elements):
+    """
+    Fiat-Shamir 挑战: c = H(elem_1 || elem_2 || ...)
+    各元素的序列化字节拼接为转录后做 sha256，摘要再映射到 ZR
+    元素也可以直接以已序列化的字节传入（避免同一元素重复序列化）
+    """
+    # bytes.join 先计算总长度、一次分配，再整体做一次 sha256
+    transcript = b"".join([elem if isinstance(elem, bytes) else serialize_bytes(elem) for elem in elements])
+    return group.hash(hashlib.sha256(transcript).hexdigest(), ZR)
+
+
+def random_zr_batch(k: int) -> List:
+    """
+    一次生成 k 个 ZR 随机数，始终返回列表
+    charm 的 group.random(ZR, count=k) 内部同样逐个生成，且 k == 1 时返回单个元素而非元组，
+    这里用 map 直接调用 group.random，调用方可统一解包
+    """
+    return list(map(group.random, [ZR] * k))
+
+
+def precompute_fixed_bases(bases: List):
+    """
+    为固定底数（g1、h0..hn）建立窗口预计算表
+    charm 的 initPP 在底层保存固定底数的预计算倍数表，之后 base ** e 自动走查表路径；
+    表随元素对象本身保存，同一份 PP 生成的所有证明共用，无需在 PP 中另存
+    """
+    for base in bases:
+        base.initPP()
+
+
+def multi_exp(bases: List, exponents: List):
+    """
+    计算多底数幂乘积 Π bases[i] ^ exponents[i]
+
+    charm 未提供多标量乘法接口，这里对每一项使用原生幂运算后累乘；
+    所有 (底数, 指数) 对在同一处求值，调用方无需关心具体算法
+    """
+    result = bases[0] ** exponents[0]
+    for base, exponent in zip(bases[1:], exponents[1:]):
+        result = result * (base ** exponent)
     return result
 
 
@@ -57,6 +137,8 @@ class Issuer:
 
     def __init__(self):
         self.PP: Optional[Dict] = None
+        self.pp_serialized: Optional[Dict] = None  # 序列化后的公共参数，setup 时生成一次
+        self.pp_serialized_bytes: Optional[Dict] = None  # 同上，群元素为原始字节（msgpack 传输用）
         self.sk = None
         self.is_setup = False
 
@@ -81,11 +163,15 @@ class Issuer:
             "hp": hp,
             "H": group.hash,
         }
-        for i in range(0, n + 1):
-            h = group.random(G1)
+        # h0..hn 同时以列表 PP["h"] 保存，热路径按下标访问
+        PP["h"] = [group.random(G1) for _ in range(0, n + 1)]
+        for i, h in enumerate(PP["h"]):
             PP[f"h{i}"] = h
+        precompute_fixed_bases([g1] + PP["h"])
 
         self.PP = PP
+        self.pp_serialized = serialize_pp(PP)
+        self.pp_serialized_bytes = serialize_pp_bytes(PP)
         self.sk = sk
         self.is_setup = True
 
@@ -112,8 +198,7 @@ class Issuer:
         z = proof["z"]
 
         # 计算挑战值 c = H(h_i || commitment || R)
-        challenge_input = serialize_element(h_i) + serialize_element(commitment) + serialize_element(R)
-        c = group.hash(challenge_input, ZR)
+        c = hash_challenge(h_i, commitment, R)
 
         # 验证 h_i ^ z == commitment ^ c * R
         lhs = h_i ** z
@@ -147,8 +232,9 @@ class Issuer:
         g1, h0 = PP["g1"], PP["h0"]
         x, s = group.random(ZR), group.random(ZR)
 
-        # 计算 A = g1 + h0*s
-        A = g1 * (h0 ** s)
+        # 收集 A = g1 * h0^s * Π h_i^m_i 中所有 (底数, 指数) 对，最后统一求值
+        bases, exponents = [h0], [s]
+        commitments = []
 
         # 遍历所有属性
         for i in range(1, PP["n"] + 1):
@@ -162,8 +248,8 @@ class Issuer:
 
             if "value" in attr:
                 # 公开属性: 直接哈希计算
-                m_i = PP["H"](attr["value"], ZR)
-                A = A * (h_i ** m_i)
+                bases.append(h_i)
+                exponents.append(hash_to_zr(attr["value"]))
 
             elif "commitment" in attr and "proof" in attr:
                 # 盲属性: 先验证 NIZK
@@ -174,12 +260,16 @@ class Issuer:
                     print(f"属性 {key} 的零知识证明验证失败")
                     return None
 
-                # 验证通过，直接使用承诺值（commitment = h_i ^ m_i）
-                A = A * commitment
+                # 验证通过，直接使用承诺值（commitment = h_i ^ m_i，指数未知）
+                commitments.append(commitment)
 
             else:
                 return None  # 格式错误
 
+        A = g1 * multi_exp(bases, exponents)
+        for commitment in commitments:
+            A = A * commitment
+
         # A = A ^ (1 / (sk + x))
         A = A ** (1 / (self.sk + x))
 
@@ -202,12 +292,18 @@ issuer = Issuer()
 def get_pp():
     """
     获取公共参数
+    请求头 Accept 为 application/msgpack 时返回 msgpack 编码，群元素为原始字节
     """
     if not issuer.is_setup:
-        return jsonify({"error": "Issuer尚未初始化，请先调用 /setup"}), 400
+        return ojsonify({"error": "Issuer尚未初始化，请先调用 /setup"}), 400
 
-    return jsonify({
-        "pp": serialize_pp(issuer.PP)
+    if request.accept_mimetypes.best_match(['application/json', 'application/msgpack']) == 'application/msgpack':
+        import msgpack
+        body = msgpack.packb({"pp": issuer.pp_serialized_bytes}, use_bin_type=True)
+        return app.response_class(body, mimetype='application/msgpack'), 200
+
+    return ojsonify({
+        "pp": issuer.pp_serialized
     }), 200
 
 
@@ -225,18 +321,18 @@ def issue():
     }
     """
     if not issuer.is_setup:
-        return jsonify({"error": "Issuer尚未初始化，请先调用 /setup"}), 400
+        return ojsonify({"error": "Issuer尚未初始化，请先调用 /setup"}), 400
 
     data = request.get_json()
 
     if not data or 'attributes' not in data:
-        return jsonify({"error": "需要提供 'attributes' 字段"}), 400
+        return ojsonify({"error": "需要提供 'attributes' 字段"}), 400
 
     raw_attrs = data['attributes']
 
     # 检查属性数量
     if len(raw_attrs) != issuer.PP["n"]:
-        return jsonify({
+        return ojsonify({
             "error": f"属性数量不匹配，期望 {issuer.PP['n']}，收到 {len(raw_attrs)}"
         }), 400
 
@@ -245,7 +341,7 @@ def issue():
     for i in range(1, issuer.PP["n"] + 1):
         key = f"m{i}"
         if key not in raw_attrs:
-            return jsonify({"error": f"缺少属性 {key}"}), 400
+            return ojsonify({"error": f"缺少属性 {key}"}), 400
 
         attr = raw_attrs[key]
 
@@ -266,9 +362,9 @@ def issue():
                     "proof": proof,
                 }
             except Exception as e:
-                return jsonify({"error": f"属性 {key} 反序列化失败: {str(e)}"}), 400
+                return ojsonify({"error": f"属性 {key} 反序列化失败: {str(e)}"}), 400
         else:
-            return jsonify({
+            return ojsonify({
                 "error": f"属性 {key} 格式错误，需要 'value' 或 'commitment'+'proof'"
             }), 400
 
@@ -276,9 +372,9 @@ def issue():
     credential = issuer.issue(attributes)
 
     if credential is None:
-        return jsonify({"error": "凭证颁发失败，零知识证明验证不通过或参数错误"}), 400
+        return ojsonify({"error": "凭证颁发失败，零知识证明验证不通过或参数错误"}), 400
 
-    return jsonify({
+    return ojsonify({
         "message": "凭证颁发成功",
         "credential": {
             "A": serialize_element(credential["A"]),
@@ -293,7 +389,7 @@ def index():
     """
     API根路径，返回可用端点
     """
-    return jsonify({
+    return ojsonify({
         "message": "Issuer颁发者服务",
         "endpoints": {
             "GET  /pp": "获取公共参数",
@@ -308,6 +404,7 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Issuer颁发者服务')
     parser.add_argument('-n', type=int, default=10, help='属性数量上限（默认: 10）')
     parser.add_argument('--port', type=int, default=5002, help='服务端口（默认: 5002）')
+    parser.add_argument('--debug', action='store_true', help='使用 Flask 开发服务器（调试模式）')
     args = parser.parse_args()
 
     print("=" * 60)
@@ -315,4 +412,9 @@ if __name__ == '__main__':
     print("=" * 60)
 
     issuer.setup(args.n)
-    app.run(debug=True, host='0.0.0.0', port=args.port)
+
+    if args.debug:
+        app.run(debug=True, host='0.0.0.0', port=args.port)
+    else:
+        from waitress import serve
+        serve(app, host='0.0.0.0', port=args.port, threads=8)
@@ -1,11 +1,11 @@
 import requests
 from typing import Dict, Set, Optional
-from charm.toolbox.pairinggroup import PairingGroup, G1, ZR
+from charm.toolbox.pairinggroup import G1, ZR
 
-from src.issuer import deserialize_pp, serialize_element, deserialize_element
-
-# 与 issuer / verifier 保持同一群参数
-group = PairingGroup('MNT224')
+from src.issuer import (
+    group, deserialize_pp, serialize_element, serialize_bytes, deserialize_element,
+    hash_challenge, hash_to_zr, multi_exp, random_zr_batch,
+)
 
 
 class User:
@@ -24,22 +24,28 @@ class User:
         self.blockchain_base_url = blockchain_base_url.rstrip('/')
         self.verifier_base_url = verifier_base_url.rstrip('/')
         self.timeout = timeout
+        # 复用 keep-alive 连接，避免每次请求重新建立 TCP/TLS 连接
+        self._session = requests.Session()
 
         self.PP: Optional[Dict] = None
         self.attributes: Optional[Dict[str, str]] = None
         self.credential: Optional[Dict] = None   # {A, x, s} (group elements)
         self.did: Optional[Dict] = None          # {u, v} (group elements), 按用户语义保存 u = v^s
 
+        self._messages: Optional[Dict] = None    # {i: ZR} 属性哈希缓存，申请新凭证时失效
+        self._h_pow_m: Optional[Dict] = None     # {i: h_i^m_i}，凭证或公共参数变化时失效
+        self._B = None                           # B = g1 * h0^s * Π h_i^m_i，凭证或公共参数变化时失效
+
     # ==================== HTTP Helpers ====================
 
     def _post_json(self, url: str, payload: Dict) -> Dict:
-        resp = requests.post(url, json=payload, timeout=self.timeout)
+        resp = self._session.post(url, json=payload, timeout=self.timeout)
         if resp.status_code >= 400:
             raise RuntimeError(f"POST {url} failed: {resp.status_code} {resp.text}")
         return resp.json()
 
     def _get_json(self, url: str) -> Dict:
-        resp = requests.get(url, timeout=self.timeout)
+        resp = self._session.get(url, timeout=self.timeout)
         if resp.status_code >= 400:
             raise RuntimeError(f"GET {url} failed: {resp.status_code} {resp.text}")
         return resp.json()
@@ -50,6 +56,8 @@ class User:
         """从 Issuer 获取公共参数并反序列化"""
         data = self._get_json(f"{self.issuer_base_url}/pp")
         self.PP = deserialize_pp(data["pp"])
+        self._h_pow_m = None
+        self._B = None
         return self.PP
 
     def request_credential(self, attributes: Dict[str, str]) -> Dict:
@@ -77,8 +85,38 @@ class User:
             "s": deserialize_element(raw["s"]),
         }
         self.attributes = attributes
+        self._messages = None
+        self._precompute_credential_values()
         return self.credential
 
+    def _get_messages(self) -> Dict:
+        """将属性映射到 ZR（首次计算后缓存，属性在申请凭证后不再变化）"""
+        if self._messages is None:
+            messages = {}
+            for i in range(1, self.PP["n"] + 1):
+                key = f"m{i}"
+                if key not in self.attributes:
+                    raise RuntimeError(f"缺少属性 {key}")
+                messages[i] = hash_to_zr(self.attributes[key])
+            self._messages = messages
+        return self._messages
+
+    def _precompute_credential_values(self):
+        """
+        预计算仅依赖凭证与公共参数的值:
+            h_i^m_i（每个属性一次）以及 B = g1 * h0^s * Π h_i^m_i
+        之后每次生成证明时 B 和 B_D 都只需做群乘法
+        """
+        PP = self.PP
+        messages = self._get_messages()
+
+        self._h_pow_m = {i: PP[f"h{i}"] ** messages[i] for i in range(1, PP["n"] + 1)}
+
+        B = PP["g1"] * (PP["h0"] ** self.credential["s"])
+        for i in range(1, PP["n"] + 1):
+            B = B * self._h_pow_m[i]
+        self._B = B
+
     # ==================== Step 2: 生成 DID 并上链 ====================
 
     def generate_did(self) -> Dict:
@@ -141,65 +179,57 @@ class User:
         did_v_for_verifier = self.did["u"]
 
         # 属性映射到 ZR
-        messages = {}
-        for i in range(1, n + 1):
-            key = f"m{i}"
-            if key not in self.attributes:
-                raise RuntimeError(f"缺少属性 {key}")
-            messages[i] = PP["H"](self.attributes[key], ZR)
+        messages = self._get_messages()
 
         hidden_indices = set(range(1, n + 1)) - disclosed_indices
 
         # 随机化凭证
         r1 = group.random(ZR)
         A_prime = A ** r1
+        # A'^{-1} 只求逆一次，A_bar 与 T 中 A' 的负指数改为以 A'^{-1} 为底的正指数
+        A_prime_inv = A_prime ** -1
 
-        B = PP["g1"] * (PP["h0"] ** s)
-        for i in range(1, n + 1):
-            B = B * (PP[f"h{i}"] ** messages[i])
-
-        A_bar = (A_prime ** (-x)) * (B ** r1)
+        if self._B is None:
+            self._precompute_credential_values()
+        B = self._B
 
-        s_prime = s * r1
-        m_primes = {i: messages[i] * r1 for i in hidden_indices}
+        A_bar = (A_prime_inv ** x) * (B ** r1)
 
         # Schnorr 承诺随机数
-        k_x = group.random(ZR)
-        k_r1 = group.random(ZR)
-        k_s_prime = group.random(ZR)
-        k_s = group.random(ZR)
-        k_m_primes = {i: group.random(ZR) for i in hidden_indices}
+        hidden_order = sorted(hidden_indices)
+        k_x, k_r1, k_s_prime, k_s, *k_hidden = random_zr_batch(4 + len(hidden_order))
+        k_m_primes = dict(zip(hidden_order, k_hidden))
 
         # B_D = g1 * Π_{j∈D} h_j^m_j
         B_D = PP["g1"]
         for j in disclosed_indices:
-            B_D = B_D * (PP[f"h{j}"] ** messages[j])
+            B_D = B_D * self._h_pow_m[j]
 
-        T = (A_prime ** (-k_x)) * (B_D ** k_r1) * (PP["h0"] ** k_s_prime)
-        for i in hidden_indices:
-            T = T * (PP[f"h{i}"] ** k_m_primes[i])
+        T = multi_exp(
+            [A_prime_inv, B_D, PP["h0"]] + [PP[f"h{i}"] for i in hidden_indices],
+            [k_x, k_r1, k_s_prime] + [k_m_primes[i] for i in hidden_indices],
+        )
 
         # DID 关联证明
         R3 = did_u_for_verifier ** k_s
 
-        # challenge
-        challenge_input = (
-            serialize_element(A_prime)
-            + serialize_element(A_bar)
-            + serialize_element(T)
-            + serialize_element(R3)
-        )
-        c = group.hash(challenge_input, ZR)
+        # challenge（A'、A_bar、R3 只序列化一次，挑战值与返回的证明共用）
+        A_prime_bytes = serialize_bytes(A_prime)
+        A_bar_bytes = serialize_bytes(A_bar)
+        R3_bytes = serialize_bytes(R3)
+        c = hash_challenge(A_prime_bytes, A_bar_bytes, T, R3_bytes)
 
         # responses
         z_x = k_x + c * x
         z_r1 = k_r1 + c * r1
-        z_s_prime = k_s_prime + c * s_prime
+        # s' = s * r1、m_i' = m_i * r1 不单独计算，c * r1 只算一次后折叠进响应
+        c_r1 = c * r1
+        z_s_prime = k_s_prime + c_r1 * s
         z_s = k_s + c * s
 
         z_hidden = {}
         for i in hidden_indices:
-            z_hidden[f"m{i}"] = k_m_primes[i] + c * m_primes[i]
+            z_hidden[f"m{i}"] = k_m_primes[i] + c_r1 * messages[i]
 
         disclosed_attrs = {f"m{j}": self.attributes[f"m{j}"] for j in disclosed_indices}
 
@@ -207,14 +237,14 @@ class User:
             "disclosed_attrs": disclosed_attrs,
             "did_u": serialize_element(did_u_for_verifier),
             "did_v": serialize_element(did_v_for_verifier),
-            "A_prime": serialize_element(A_prime),
-            "A_bar": serialize_element(A_bar),
+            "A_prime": A_prime_bytes.decode('ascii'),
+            "A_bar": A_bar_bytes.decode('ascii'),
             "c": serialize_element(c),
             "z_x": serialize_element(z_x),
             "z_r1": serialize_element(z_r1),
             "z_s_prime": serialize_element(z_s_prime),
             "z_s": serialize_element(z_s),
-            "R3": serialize_element(R3),
+            "R3": R3_bytes.decode('ascii'),
             "z_hidden": {k: serialize_element(v) for k, v in z_hidden.items()},
         }
 
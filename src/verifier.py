@@ -1,12 +1,71 @@
-from flask import Flask, jsonify, request
-from charm.toolbox.pairinggroup import PairingGroup, G1, G2, ZR, pair
+from flask import Flask, Response, request
+from charm.toolbox.pairinggroup import PairingGroup, G1, G2, GT, ZR, pair, pc_element
 import argparse
-from typing import Dict, Optional
+import hashlib
+import orjson
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
 
 app = Flask(__name__)
 
-# 初始化配对群
-group = PairingGroup('MNT224')
+
+def ojsonify(obj) -> Response:
+    """使用 orjson 序列化 JSON 响应（替代 flask.jsonify）"""
+    return app.response_class(orjson.dumps(obj), mimetype='application/json')
+
+
+def orjson_request() -> Optional[Dict]:
+    """使用 orjson 解析请求体（替代 request.get_json），请求体不是合法 JSON 时返回 None"""
+    try:
+        return orjson.loads(request.get_data())
+    except orjson.JSONDecodeError:
+        return None
+
+
+# 初始化配对群（BN254: Type-3 非对称配对，比 MNT224 更快；各服务须使用同一曲线）
+group = PairingGroup('BN254')
+
+
+# ==================== Public Parameters ====================
+
+@dataclass(frozen=True)
+class PublicParams:
+    """
+    反序列化后的公共参数（加载后不可变），验证热路径以属性方式访问
+    h = (h0, h1, ..., hn)；同时支持 PP["g1"]、PP["h1"] 等字典式访问以兼容旧代码
+    """
+    __slots__ = ("g1", "g2", "pk", "n", "hp", "h")
+
+    g1: object
+    g2: object
+    pk: object
+    n: int
+    hp: object
+    h: Tuple
+
+    @classmethod
+    def from_dict(cls, PP: Dict) -> "PublicParams":
+        """由 Issuer 的字典形式公共参数构建"""
+        h = PP["h"] if "h" in PP else [PP[f"h{i}"] for i in range(0, PP["n"] + 1)]
+        return cls(g1=PP["g1"], g2=PP["g2"], pk=PP["pk"], n=PP["n"], hp=PP["hp"], h=tuple(h))
+
+    @property
+    def h0(self):
+        return self.h[0]
+
+    @property
+    def H(self):
+        return group.hash
+
+    def __getitem__(self, key: str):
+        if key[:1] == "h" and key[1:].isdigit():
+            return self.h[int(key[1:])]
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
 
 
 # ==================== Serialization Utilities ====================
@@ -16,68 +75,234 @@ def serialize_element(elem) -> str:
     return group.serialize(elem).decode('utf-8')
 
 
-def deserialize_element(s: str):
-    """将字符串反序列化为群元素（charm-crypto内部格式）"""
-    return group.deserialize(s.encode('utf-8'))
+def serialize_bytes(elem) -> bytes:
+    """将群元素序列化为字节串（不做字符串解码，用于哈希输入）"""
+    return group.serialize(elem)
 
 
-def deserialize_pp(data: Dict) -> Dict:
+def hash_challenge(*elements):
+    """
+    Fiat-Shamir 挑战: c = H(elem_1 || elem_2 || ...)
+    各元素的序列化字节拼接为转录后做 sha256，摘要再映射到 ZR
+    元素也可以直接以已序列化的字节传入（如请求中原样收到的字节）
+    """
+    # bytes.join 先计算总长度、一次分配，再整体做一次 sha256
+    transcript = b"".join([elem if isinstance(elem, bytes) else serialize_bytes(elem) for elem in elements])
+    return group.hash(hashlib.sha256(transcript).hexdigest(), ZR)
+
+
+def deserialize_element(s: Union[str, bytes]):
+    """将字符串或 ASCII 字节反序列化为群元素（charm-crypto内部格式）"""
+    if isinstance(s, str):
+        s = s.encode('ascii')
+    return group.deserialize(s)
+
+
+def deserialize_pp(data: Dict) -> "PublicParams":
     """反序列化公共参数"""
-    result = {
-        "g1": deserialize_element(data["g1"]),
-        "g2": deserialize_element(data["g2"]),
-        "pk": deserialize_element(data["pk"]),
-        "n": data["n"],
-        "hp": deserialize_element(data["hp"]),
-        "H": group.hash,
+    return PublicParams(
+        g1=deserialize_element(data["g1"]),
+        g2=deserialize_element(data["g2"]),
+        pk=deserialize_element(data["pk"]),
+        n=data["n"],
+        hp=deserialize_element(data["hp"]),
+        h=tuple(deserialize_element(data[f"h{i}"]) for i in range(0, data["n"] + 1)),
+    )
+
+
+def deserialize_proof(data: Dict) -> Dict:
+    """
+    反序列化用户提交的证明（/verify 请求体格式）
+    群元素以 ASCII 字节反序列化；A'、A_bar、R3 的原始字节保留在 "raw" 中供挑战值复用
+    DID 字段（did_u / did_v / z_s / R3）按出现情况逐个反序列化，是否齐全由 Verifier 结构检查判定
+    """
+    raw = {k: data[k].encode('ascii') for k in ("A_prime", "A_bar")}
+    if "R3" in data:
+        raw["R3"] = data["R3"].encode('ascii')
+    proof = {
+        "disclosed_attrs": data["disclosed_attrs"],
+        "A_prime": deserialize_element(raw["A_prime"]),
+        "A_bar": deserialize_element(raw["A_bar"]),
+        "c": deserialize_element(data["c"].encode('ascii')),
+        "z_x": deserialize_element(data["z_x"].encode('ascii')),
+        "z_r1": deserialize_element(data["z_r1"].encode('ascii')),
+        "z_s_prime": deserialize_element(data["z_s_prime"].encode('ascii')),
+        "z_hidden": {
+            k: deserialize_element(v.encode('ascii')) for k, v in data["z_hidden"].items()
+        },
+        "raw": raw,
     }
-    for i in range(0, data["n"] + 1):
-        result[f"h{i}"] = deserialize_element(data[f"h{i}"])
+    for key in DID_FIELDS:
+        if key in data:
+            proof[key] = deserialize_element(raw[key] if key in raw else data[key].encode('ascii'))
+    return proof
+
+
+# ==================== Group Arithmetic Utilities ====================
+
+@lru_cache(maxsize=4096)
+def hash_to_zr(value: str):
+    """将属性字符串哈希到 ZR（结果确定，按字符串缓存）"""
+    return group.hash(value, ZR)
+
+
+def is_group_element(elem, elem_type) -> bool:
+    """
+    检查 elem 是否为指定群（G1 / ZR 等）的元素，只比较元素类型，不做幂运算
+    不调用 group.ismember: G1 上它要做一次阶数幂；BN254 的 G1 余因子为 1，
+    反序列化得到的曲线点即在子群中，成员检查不增加安全性
+    """
+    return isinstance(elem, pc_element) and elem.type == elem_type
+
+
+def multi_exp(bases: List, exponents: List):
+    """
+    计算多底数幂乘积 Π bases[i] ^ exponents[i]
+
+    charm 未提供多标量乘法接口，这里对每一项使用原生幂运算后累乘；
+    所有 (底数, 指数) 对在同一处求值，调用方无需关心具体算法
+    """
+    result = bases[0] ** exponents[0]
+    for base, exponent in zip(bases[1:], exponents[1:]):
+        result = result * (base ** exponent)
     return result
 
 
 # ==================== Verifier Implementation ====================
 
+# WSGI 服务器的请求线程数
+SERVER_THREADS = 8
+
+# 保证并发 /setup 时只有一次能写入 PP
+_setup_lock = threading.Lock()
+
+# B_D 缓存的条目上限，超过后整体清空
+B_D_CACHE_SIZE = 1024
+
+# 证明中必须包含的字段（"raw" 为可选）
+PROOF_FIELDS = (
+    "disclosed_attrs", "A_prime", "A_bar", "c",
+    "z_x", "z_r1", "z_s_prime", "z_hidden",
+)
+# DID 绑定字段: 须同时提供或同时省略（省略表示证明不带 DID 绑定）
+DID_FIELDS = ("did_u", "did_v", "z_s", "R3")
+# 各字段应属的群（DID 字段仅在出现时检查）
+G1_FIELDS = ("A_prime", "A_bar", "did_u", "did_v", "R3")
+ZR_FIELDS = ("c", "z_x", "z_r1", "z_s_prime", "z_s")
+
+
 class Verifier:
     """BBS+ 选择性披露验证者"""
 
+    # 固定属性集合，热路径上的 self.PP / self.policy 访问走槽位而非实例字典
+    __slots__ = ("PP", "policy", "require_did", "gt_identity", "g1_identity", "_b_d_cache")
+
     def __init__(self):
-        self.PP: Optional[Dict] = None
+        self.PP: Optional[PublicParams] = None  # None 表示尚未加载公共参数
         self.policy: Optional[Dict] = None
-        self.is_setup = False
+        self.require_did = True  # 策略是否要求证明携带 DID 绑定
+        self.gt_identity = None
+        self.g1_identity = None
+        self._b_d_cache: Dict[Tuple, object] = {}  # 公开属性 -> B_D，重新加载公共参数时清空
 
-    def setup(self, PP: Dict):
+    def setup(self, PP: Union[Dict, PublicParams]):
         """
-        加载公共参数
+        加载公共参数（只能加载一次；加载后 PP 不可变，验证线程读取时无需加锁）
         Args:
-            PP: 与 Issuer 相同的公共参数
+            PP: 与 Issuer 相同的公共参数（字典形式会转换为 PublicParams）
+        Raises:
+            RuntimeError: 公共参数已加载
         """
-        self.PP = PP
-        self.is_setup = True
+        if self.PP is not None:
+            raise RuntimeError("公共参数已加载，不能重复设置")
+        if not isinstance(PP, PublicParams):
+            PP = PublicParams.from_dict(PP)
+
+        # G_T 单位元在加载时构造一次（配对乘积检查），同时用于公共参数退化检查: e(g1, g2) 不能为单位元
+        gt_identity = group.init(GT, 1)
+        if pair(PP.g1, PP.g2) == gt_identity:
+            raise ValueError("公共参数退化: e(g1, g2) 为单位元")
+
+        # g1、h0..hn 是每次验证 multi_exp 的固定底数，加载时建立一次预计算表（charm initPP）
+        for base in (PP.g1,) + PP.h:
+            base.initPP()
+
+        # G1 单位元在加载时计算一次（退化证明检查）
+        g1_identity = PP.g1 ** group.init(ZR, 0)
+
+        # 常量先算入局部变量，在锁内通过二次检查后统一写入；
+        # 竞争失败的并发 setup 不会覆盖已加载实例的常量与缓存。PP 最后赋值: PP 不为 None 即表示常量均已就绪
+        with _setup_lock:
+            if self.PP is not None:
+                raise RuntimeError("公共参数已加载，不能重复设置")
+            self.gt_identity = gt_identity
+            self.g1_identity = g1_identity
+            self._b_d_cache = {}
+            self.PP = PP
         print("Verifier 已加载公共参数")
 
-    def set_policy(self, policy: Dict):
+    def set_policy(self, policy: Dict, require_did: bool = True):
         """
         设置访问策略
         Args:
             policy: {"m1": "100", "m3": "105"} — 要求公开并匹配的属性
+            require_did: 是否要求证明携带 DID 绑定（为 False 时也接受不含 DID 字段的证明）
         """
         self.policy = policy
-        print(f"访问策略已设置: {policy}")
+        self.require_did = require_did
+        print(f"访问策略已设置: {policy}, 要求 DID: {require_did}")
 
     def get_policy(self) -> Optional[Dict]:
         """获取当前访问策略"""
         return self.policy
 
+    def _check_structure(self, proof: Dict) -> Optional[str]:
+        """
+        证明结构检查: 必需字段齐全，公开属性与隐藏属性不重叠且恰好覆盖 m1..mn，
+        群元素字段类型正确（A'、A_bar、R3、did_* ∈ G1，c、z_* ∈ ZR；只比较类型，不做群运算）
+        Returns:
+            错误描述，结构合法时返回 None
+        """
+        for key in PROOF_FIELDS:
+            if key not in proof:
+                return f"缺少字段 {key}"
+        did_missing = [key for key in DID_FIELDS if key not in proof]
+        if did_missing and len(did_missing) != len(DID_FIELDS):
+            return f"DID 字段须同时提供或同时省略，缺少 {', '.join(did_missing)}"
+
+        disclosed_attrs = proof["disclosed_attrs"]
+        z_hidden = proof["z_hidden"]
+        if not isinstance(disclosed_attrs, dict) or not isinstance(z_hidden, dict):
+            return "disclosed_attrs 与 z_hidden 必须为字典"
+        if not all(isinstance(value, str) for value in disclosed_attrs.values()):
+            return "公开属性值必须为字符串"
+
+        expected = {f"m{i}" for i in range(1, self.PP.n + 1)}
+        if disclosed_attrs.keys() & z_hidden.keys():
+            return "属性不能同时公开和隐藏"
+        if disclosed_attrs.keys() | z_hidden.keys() != expected:
+            return f"公开属性与隐藏属性须恰好覆盖 m1..m{self.PP.n}"
+
+        for key in G1_FIELDS:
+            if key in proof and not is_group_element(proof[key], G1):
+                return f"{key} 必须为 G1 元素"
+        for key in ZR_FIELDS:
+            if key in proof and not is_group_element(proof[key], ZR):
+                return f"{key} 必须为 ZR 元素"
+        if not all(is_group_element(z_mi, ZR) for z_mi in z_hidden.values()):
+            return "z_hidden 中的响应必须为 ZR 元素"
+        return None
+
     def verify(self, proof: Dict) -> Dict:
         """
         验证用户的选择性披露证明
 
-        BBS+ 选择性披露验证协议:
+        BBS+ 选择性披露验证协议（按计算代价从低到高排列，失败即提前返回）:
+            0. 结构检查: 字段齐全且属于正确的群，公开/隐藏属性恰好覆盖 m1..mn，A' 不为单位元
             1. 策略检查: 公开属性是否满足访问策略
-            2. 配对检查: e(A_bar, g2) == e(A_prime, pk) — 凭证有效性
-            3. Schnorr 验证: c == H(A' || A_bar || T' || R3)
-            4. DID 验证: u^{z_s} == R3 * v^c — 身份陷门一致性
+            2. DID 验证: u^{z_s} == R3 * v^c — 身份陷门一致性（证明不含 R3 时仅在策略不要求 DID 时跳过）
+            3. Schnorr 验证: c == H(A' || A_bar || T' || R3)（无 DID 时为 H(A' || A_bar || T')）
+            4. 配对检查: e(A_bar, g2) == e(A_prime, pk) — 凭证有效性（最贵，最后做）
 
         proof 结构:
             {
@@ -96,17 +321,103 @@ class Verifier:
                     "m4": ZR,
                 },
                 "R3": G1,            # u^{k_s}，证明 v=u^s 中的 s 与凭证一致
+                                     # did_u / did_v / z_s / R3 可整体省略（策略不要求 DID 时）
+                "raw": {             # 可选: A_prime / A_bar / R3 的原始序列化字节，计算挑战值时直接复用
+                    "A_prime": bytes, "A_bar": bytes, "R3": bytes,
+                },
             }
 
         Returns:
             {"valid": bool, "message": str}
         """
-        if not self.is_setup:
+        if self.PP is None:
             return {"valid": False, "message": "Verifier 未初始化"}
         if self.policy is None:
             return {"valid": False, "message": "访问策略未设置"}
 
-        PP = self.PP
+        failure = self._precheck(proof)
+        if failure is not None:
+            return failure
+
+        # ========== Step 3: Schnorr 验证 ==========
+        if not self._check_schnorr(proof):
+            return {"valid": False, "message": "零知识证明验证失败"}
+
+        # ========== Step 4: 配对检查 e(A_bar, g2) == e(A_prime, pk) ==========
+        # 改写为 e(A_bar, g2) * e(A'^{-1}, pk) == 1_GT:
+        # 两个 Miller loop 合并计算，只做一次最终幂；Schnorr 未通过的证明不做配对
+        if not self._check_pairing(proof):
+            return {"valid": False, "message": "配对检查失败，凭证无效"}
+
+        return {"valid": True, "message": "验证通过"}
+
+    def verify_batch(self, proofs: List[Dict]) -> List[Dict]:
+        """
+        批量验证多个证明，所有配对检查合并为一次配对乘积
+
+        每个证明先单独完成结构、策略、DID 与 Schnorr 检查（单个证明出错只判定该证明无效）；通过的证明取随机 ρ，
+        以 ρ_i = ρ^i 作线性组合，检查
+            Π_i e(A_bar_i, g2)^{ρ_i} == Π_i e(A'_i, pk)^{ρ_i}
+            即 e(Π A_bar_i^{ρ_i}, g2) == e(Π A'_i^{ρ_i}, pk)
+        无论证明数量多少都只需两次配对。合并检查失败时逐个做配对检查定位无效证明。
+
+        Returns:
+            与 proofs 一一对应的 [{"valid": bool, "message": str}, ...]
+        """
+        if self.PP is None:
+            return [{"valid": False, "message": "Verifier 未初始化"} for _ in proofs]
+        if self.policy is None:
+            return [{"valid": False, "message": "访问策略未设置"} for _ in proofs]
+
+        results: List[Optional[Dict]] = []
+        pending = []  # 通过非配对检查、等待合并配对检查的证明下标
+        for index, proof in enumerate(proofs):
+            try:
+                failure = self._precheck(proof)
+                if failure is None and not self._check_schnorr(proof):
+                    failure = {"valid": False, "message": "零知识证明验证失败"}
+            except Exception as e:
+                failure = {"valid": False, "message": f"证明验证出错: {str(e)}"}
+            results.append(failure)
+            if failure is None:
+                pending.append(index)
+
+        if pending:
+            rho = group.random(ZR)
+            rho_i = rho
+            A_bar_acc, A_prime_acc = None, None
+            for index in pending:
+                term_bar = proofs[index]["A_bar"] ** rho_i
+                term_prime = proofs[index]["A_prime"] ** rho_i
+                A_bar_acc = term_bar if A_bar_acc is None else A_bar_acc * term_bar
+                A_prime_acc = term_prime if A_prime_acc is None else A_prime_acc * term_prime
+                rho_i = rho_i * rho
+
+            batch_valid = pair(A_bar_acc, self.PP.g2) == pair(A_prime_acc, self.PP.pk)
+
+            for index in pending:
+                if batch_valid or self._check_pairing(proofs[index]):
+                    results[index] = {"valid": True, "message": "验证通过"}
+                else:
+                    results[index] = {"valid": False, "message": "配对检查失败，凭证无效"}
+
+        return results
+
+    def _precheck(self, proof: Dict) -> Optional[Dict]:
+        """
+        不涉及配对与 T' 重算的检查: 结构、访问策略、DID
+        Returns:
+            失败时返回 {"valid": False, "message": str}，全部通过返回 None
+        """
+        # ========== Step 0: 结构检查（只检查字段与元素类型，不做任何群运算） ==========
+        error = self._check_structure(proof)
+        if error is not None:
+            return {"valid": False, "message": f"证明格式错误: {error}"}
+
+        # A' 为单位元时 A_bar 取单位元即可平凡通过配对检查，直接拒绝
+        if proof["A_prime"] == self.g1_identity:
+            return {"valid": False, "message": "证明格式错误: A' 不能为单位元"}
+
         disclosed_attrs = proof["disclosed_attrs"]
 
         # ========== Step 1: 检查公开属性是否满足访问策略 ==========
@@ -123,64 +434,90 @@ class Verifier:
                                f"期望 '{required_value}', 收到 '{disclosed_attrs[attr_key]}'"
                 }
 
-        # ========== Step 2: 配对检查 e(A_bar, g2) == e(A_prime, pk) ==========
-        A_prime = proof["A_prime"]
-        A_bar = proof["A_bar"]
+        # ========== Step 2: DID 验证 — 证明 v = u^s 中的 s 与凭证一致 ==========
+        if "R3" not in proof:
+            if self.require_did:
+                return {"valid": False, "message": "策略要求 DID 绑定，但证明未包含 DID"}
+            return None
 
-        lhs = pair(A_bar, PP["g2"])
-        rhs = pair(A_prime, PP["pk"])
+        # 验证: u^{z_s} == R3 * v^c（两次 G1 幂运算，远比配对便宜，先做）
+        eq_did_lhs = proof["R3"] * (proof["did_v"] ** proof["c"])
+        eq_did_rhs = proof["did_u"] ** proof["z_s"]
 
-        if lhs != rhs:
-            return {"valid": False, "message": "配对检查失败，凭证无效"}
+        if eq_did_lhs != eq_did_rhs:
+            return {"valid": False, "message": "DID 验证失败，身份陷门不一致"}
 
-        # ========== Step 3: Schnorr 验证 ==========
+        return None
+
+    def _check_pairing(self, proof: Dict) -> bool:
+        """单个证明的配对检查: e(A_bar, g2) * e(A'^{-1}, pk) == 1_GT（配对乘积，只做一次最终幂）"""
+        paired = group.pair_prod([proof["A_bar"], proof["A_prime"] ** -1], [self.PP.g2, self.PP.pk])
+        return paired == self.gt_identity
+
+    def _disclosed_base(self, disclosed_items: List[Tuple[int, str]]):
+        """
+        计算 B_D = g1 * Π_{j∈D} h_j ^ H(m_j)
+        只依赖公共参数与公开属性，按排序后的 (下标, 值) 缓存；
+        满足同一访问策略的证明公开的属性通常相同，重复请求直接复用
+        """
+        key = tuple(sorted(disclosed_items))
+        B_D = self._b_d_cache.get(key)
+        if B_D is None:
+            B_D = self.PP.g1
+            if key:
+                B_D = B_D * multi_exp(
+                    [self.PP.h[i] for i, _ in key],
+                    [hash_to_zr(attr_value) for _, attr_value in key],
+                )
+            if len(self._b_d_cache) >= B_D_CACHE_SIZE:
+                self._b_d_cache.clear()
+            self._b_d_cache[key] = B_D
+        return B_D
+
+    def _check_schnorr(self, proof: Dict) -> bool:
+        """Schnorr 验证: 重算 T' 并检查 c == H(A' || A_bar || T' || R3)"""
+        PP = self.PP
+        A_prime = proof["A_prime"]
+        A_bar = proof["A_bar"]
         c = proof["c"]
         z_x = proof["z_x"]
         z_r1 = proof["z_r1"]
         z_s_prime = proof["z_s_prime"]
-        z_s = proof["z_s"]
-        z_hidden = proof["z_hidden"]
-        R3 = proof["R3"]
-        u = proof["did_u"]
-        v = proof["did_v"]
-
-        # 计算 B_D = g1 * Π_{j∈D} h_j ^ H(m_j)
-        B_D = PP["g1"]
-        for attr_key, attr_value in disclosed_attrs.items():
-            i = int(attr_key[1:])  # "m1" -> 1
-            h_i = PP[f"h{i}"]
-            m_j = PP["H"](attr_value, ZR)
-            B_D = B_D * (h_i ** m_j)
-
-        # 重算 T' = A'^{-z_x} * B_D^{z_r1} * h0^{z_s'} * Π_{i∈H} h_i^{z_{m_i'}} * A_bar^{-c}
-        T_prime = (A_prime ** (-z_x)) * (B_D ** z_r1) * (PP["h0"] ** z_s_prime)
-
-        for attr_key, z_mi in z_hidden.items():
-            i = int(attr_key[1:])  # "m2" -> 2
-            h_i = PP[f"h{i}"]
-            T_prime = T_prime * (h_i ** z_mi)
+        R3 = proof.get("R3")
 
-        T_prime = T_prime * (A_bar ** (-c))
-
-        # 检查 c == H(A' || A_bar || T' || R3)
-        challenge_input = (serialize_element(A_prime)
-                           + serialize_element(A_bar)
-                           + serialize_element(T_prime)
-                           + serialize_element(R3))
-        c_prime = group.hash(challenge_input, ZR)
-
-        if c != c_prime:
-            return {"valid": False, "message": "零知识证明验证失败"}
+        h_table = PP.h
+        # 属性名预先拆分为 (下标, 值)，"m1" -> 1
+        disclosed_items = [(int(attr_key[1:]), attr_value) for attr_key, attr_value in proof["disclosed_attrs"].items()]
+        hidden_items = [(int(attr_key[1:]), z_mi) for attr_key, z_mi in proof["z_hidden"].items()]
 
-        # ========== Step 4: DID 验证 — 证明 v = u^s 中的 s 与凭证一致 ==========
-        # 验证: u^{z_s} == R3 * v^c
-        eq_did_lhs = R3 * (v ** c)
-        eq_did_rhs = u ** z_s
+        B_D = self._disclosed_base(disclosed_items)
 
-        if eq_did_lhs != eq_did_rhs:
-            return {"valid": False, "message": "DID 验证失败，身份陷门不一致"}
-
-        return {"valid": True, "message": "验证通过"}
+        # 重算 T' = A'^{-z_x} * B_D^{z_r1} * h0^{z_s'} * Π_{i∈H} h_i^{z_{m_i'}} * A_bar^{-c}
+        # 取负只做一次，所有 (底数, 指数) 对收集后一次性交给 multi_exp
+        neg_z_x = -z_x
+        neg_c = -c
+        bases, exponents = [A_prime, B_D, h_table[0]], [neg_z_x, z_r1, z_s_prime]
+        for i, z_mi in hidden_items:
+            bases.append(h_table[i])
+            exponents.append(z_mi)
+        bases.append(A_bar)
+        exponents.append(neg_c)
+        T_prime = multi_exp(bases, exponents)
+
+        # 检查 c == H(A' || A_bar || T' || R3)，不带 DID 的证明为 H(A' || A_bar || T')
+        # 请求中收到的原始字节可直接复用，只有 T' 需要重新序列化
+        raw = proof.get("raw", {})
+        transcript = [raw.get("A_prime", A_prime), raw.get("A_bar", A_bar), T_prime]
+        if R3 is not None:
+            transcript.append(raw.get("R3", R3))
+        return c == hash_challenge(*transcript)
+
+    def verify_serialized(self, data: Dict) -> Dict:
+        """
+        直接验证序列化形式的证明（/verify 请求体），反序列化与验证在同一入口完成
+        反序列化失败时抛出异常，由调用方处理
+        """
+        return self.verify(deserialize_proof(data))
 
 
 # ==================== Flask API Routes ====================
@@ -194,38 +531,58 @@ def setup():
     """
     加载公共参数
     POST数据格式: {"pp": {...}}  (与 Issuer /pp 接口返回格式一致)
+    Content-Type 为 application/msgpack 时，请求体为 msgpack 编码，群元素为原始字节
+    公共参数只能加载一次，重复调用返回 409
     """
-    data = request.get_json()
+    if verifier.PP is not None:
+        return ojsonify({"error": "公共参数已加载，不能重复设置"}), 409
+
+    if request.mimetype == 'application/msgpack':
+        import msgpack
+        try:
+            data = msgpack.unpackb(request.get_data(), raw=False)
+        except Exception:
+            data = None
+    else:
+        data = orjson_request()
 
     if not data or 'pp' not in data:
-        return jsonify({"error": "需要提供 'pp' 字段"}), 400
+        return ojsonify({"error": "需要提供 'pp' 字段"}), 400
 
     try:
         PP = deserialize_pp(data['pp'])
         verifier.setup(PP)
-        return jsonify({"message": "公共参数加载成功"}), 201
+        return ojsonify({"message": "公共参数加载成功"}), 201
+    except RuntimeError as e:
+        return ojsonify({"error": str(e)}), 409
     except Exception as e:
-        return jsonify({"error": f"公共参数反序列化失败: {str(e)}"}), 400
+        return ojsonify({"error": f"公共参数反序列化失败: {str(e)}"}), 400
 
 
 @app.route('/policy', methods=['POST'])
 def set_policy():
     """
     设置访问策略
-    POST数据格式: {"policy": {"m1": "100", "m3": "105"}}
+    POST数据格式: {"policy": {"m1": "100", "m3": "105"}, "require_did": true}
+    require_did 可省略，默认要求证明携带 DID 绑定
     """
-    if not verifier.is_setup:
-        return jsonify({"error": "Verifier 未初始化，请先调用 /setup"}), 400
+    if verifier.PP is None:
+        return ojsonify({"error": "Verifier 未初始化，请先调用 /setup"}), 400
 
-    data = request.get_json()
+    data = orjson_request()
 
     if not data or 'policy' not in data:
-        return jsonify({"error": "需要提供 'policy' 字段"}), 400
+        return ojsonify({"error": "需要提供 'policy' 字段"}), 400
+
+    require_did = data.get('require_did', True)
+    if not isinstance(require_did, bool):
+        return ojsonify({"error": "'require_did' 必须为布尔值"}), 400
 
-    verifier.set_policy(data['policy'])
-    return jsonify({
+    verifier.set_policy(data['policy'], require_did)
+    return ojsonify({
         "message": "访问策略已设置",
-        "policy": data['policy']
+        "policy": data['policy'],
+        "require_did": require_did
     }), 201
 
 
@@ -235,9 +592,9 @@ def get_policy():
     查询当前访问策略
     """
     if verifier.policy is None:
-        return jsonify({"error": "访问策略未设置"}), 400
+        return ojsonify({"error": "访问策略未设置"}), 400
 
-    return jsonify({"policy": verifier.policy}), 200
+    return ojsonify({"policy": verifier.policy, "require_did": verifier.require_did}), 200
 
 
 @app.route('/verify', methods=['POST'])
@@ -260,38 +617,57 @@ def verify():
         "z_hidden": {"m2": "<serialized>", "m4": "<serialized>"}
     }
     """
-    if not verifier.is_setup:
-        return jsonify({"error": "Verifier 未初始化，请先调用 /setup"}), 400
+    if verifier.PP is None:
+        return ojsonify({"error": "Verifier 未初始化，请先调用 /setup"}), 400
     if verifier.policy is None:
-        return jsonify({"error": "访问策略未设置"}), 400
+        return ojsonify({"error": "访问策略未设置"}), 400
 
-    data = request.get_json()
+    data = orjson_request()
     if not data:
-        return jsonify({"error": "需要提供证明数据"}), 400
+        return ojsonify({"error": "需要提供证明数据"}), 400
 
     try:
-        proof = {
-            "disclosed_attrs": data["disclosed_attrs"],
-            "did_u": deserialize_element(data["did_u"]),
-            "did_v": deserialize_element(data["did_v"]),
-            "A_prime": deserialize_element(data["A_prime"]),
-            "A_bar": deserialize_element(data["A_bar"]),
-            "c": deserialize_element(data["c"]),
-            "z_x": deserialize_element(data["z_x"]),
-            "z_r1": deserialize_element(data["z_r1"]),
-            "z_s_prime": deserialize_element(data["z_s_prime"]),
-            "z_s": deserialize_element(data["z_s"]),
-            "R3": deserialize_element(data["R3"]),
-            "z_hidden": {
-                k: deserialize_element(v) for k, v in data["z_hidden"].items()
-            }
-        }
+        proof = deserialize_proof(data)
     except Exception as e:
-        return jsonify({"error": f"证明反序列化失败: {str(e)}"}), 400
+        return ojsonify({"error": f"证明反序列化失败: {str(e)}"}), 400
 
     result = verifier.verify(proof)
     status = 200 if result["valid"] else 400
-    return jsonify(result), status
+    return ojsonify(result), status
+
+
+@app.route('/verify_batch', methods=['POST'])
+def verify_batch():
+    """
+    批量验证用户证明（所有配对检查合并为一次配对乘积）
+    POST数据格式: {"proofs": [<与 /verify 相同格式的证明>, ...]}
+    返回: {"results": [{"valid": bool, "message": str}, ...]}（与 proofs 顺序一致）
+    """
+    if verifier.PP is None:
+        return ojsonify({"error": "Verifier 未初始化，请先调用 /setup"}), 400
+    if verifier.policy is None:
+        return ojsonify({"error": "访问策略未设置"}), 400
+
+    data = orjson_request()
+    if not isinstance(data, dict) or not isinstance(data.get("proofs"), list):
+        return ojsonify({"error": "需要提供 'proofs' 列表"}), 400
+
+    # 反序列化失败的证明直接判定无效，其余证明参与批量验证
+    results: List[Optional[Dict]] = []
+    proofs, positions = [], []
+    for position, item in enumerate(data["proofs"]):
+        try:
+            proofs.append(deserialize_proof(item))
+        except Exception as e:
+            results.append({"valid": False, "message": f"证明反序列化失败: {str(e)}"})
+            continue
+        results.append(None)
+        positions.append(position)
+
+    for position, result in zip(positions, verifier.verify_batch(proofs)):
+        results[position] = result
+
+    return ojsonify({"results": results}), 200
 
 
 @app.route('/', methods=['GET'])
@@ -299,13 +675,14 @@ def index():
     """
     API根路径，返回可用端点
     """
-    return jsonify({
+    return ojsonify({
         "message": "Verifier验证者服务",
         "endpoints": {
-            "POST /setup": "加载公共参数 {pp: {...}}",
-            "POST /policy": "设置访问策略 {policy: {m1: '100'}}",
+            "POST /setup": "加载公共参数 {pp: {...}}（JSON 或 msgpack）",
+            "POST /policy": "设置访问策略 {policy: {m1: '100'}, require_did: true}",
             "GET  /policy": "查询当前访问策略",
             "POST /verify": "验证用户证明",
+            "POST /verify_batch": "批量验证用户证明 {proofs: [...]}",
         }
     }), 200
 
@@ -315,10 +692,19 @@ def index():
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Verifier验证者服务')
     parser.add_argument('--port', type=int, default=5003, help='服务端口（默认: 5003）')
+    parser.add_argument('--debug', action='store_true', help='使用 Flask 开发服务器（调试模式）')
     args = parser.parse_args()
 
     print("=" * 60)
     print("Verifier验证者服务启动中...")
     print("=" * 60)
 
-    app.run(debug=True, host='0.0.0.0', port=args.port)
+    # 生产环境使用多线程 WSGI 服务器；也可用 gunicorn 部署:
+    #   gunicorn -w 1 -k gthread --threads 8 -b 0.0.0.0:5003 src.verifier:app（线程数与 SERVER_THREADS 一致）
+    # 公共参数与访问策略保存在进程内（由 /setup、/policy 写入），
+    # 因此只能使用单个 worker 进程，通过线程数扩展并发
+    if args.debug:
+        app.run(debug=True, host='0.0.0.0', port=args.port)
+    else:
+        from waitress import serve
+        serve(app, host='0.0.0.0', port=args.port, threads=SERVER_THREADS)
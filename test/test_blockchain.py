@@ -162,6 +162,13 @@ def test_spv_proof():
     assert valid, "SPV 证明验证失败!"
     print("  ✅ SPV 证明验证通过")
 
+    # 格式错误的十六进制（兄弟节点或根）视为无效证明
+    bad_proof = [dict(step) for step in proof["merkle_proof"]]
+    bad_proof[0]["hash"] = "zz"
+    assert not MerkleTree.verify_proof(tx, block.merkle_root, bad_proof), "错误的兄弟节点哈希应验证失败"
+    assert not MerkleTree.verify_proof(tx, "zz", proof["merkle_proof"]), "错误的根哈希应验证失败"
+    print("  ✅ 格式错误的证明被正确拒绝")
+
 
 def test_spv_all_transactions():
     """测试7: 验证区块中所有交易的 SPV 证明"""
@@ -278,7 +285,7 @@ def test_merkle_single_transaction():
     proof = bc.get_spv_proof(1, "Solo", "Tx")
     assert proof is not None
     # 单笔交易时，Merkle 根就是交易哈希本身
-    tx_hash = MerkleTree.hash_transaction({"u": "Solo", "v": "Tx"})
+    tx_hash = MerkleTree.hash_transaction({"u": "Solo", "v": "Tx"}).hex()
     assert block.merkle_root == tx_hash, "单笔交易的 Merkle 根应等于交易哈希"
     assert len(proof["merkle_proof"]) == 0, "单笔交易的证明路径应为空"
 
@@ -8,10 +8,8 @@ Issuer 功能测试脚本
   5. BBS+ 签名验证
 """
 
-from charm.toolbox.pairinggroup import PairingGroup, G1, G2, ZR, pair
-from src.issuer import Issuer, serialize_element, deserialize_element
-
-group = PairingGroup('MNT224')
+from charm.toolbox.pairinggroup import G1, G2, ZR, pair
+from src.issuer import group, Issuer, deserialize_element, hash_challenge, hash_to_zr
 
 
 def generate_nizk_proof(h_i, m_i):
@@ -30,8 +28,7 @@ def generate_nizk_proof(h_i, m_i):
     r = group.random(ZR)
     R = h_i ** r
 
-    challenge_input = serialize_element(h_i) + serialize_element(commitment) + serialize_element(R)
-    c = group.hash(challenge_input, ZR)
+    c = hash_challenge(h_i, commitment, R)
 
     z = r + c * m_i
 
@@ -84,7 +81,7 @@ def test_all_open():
     print(f"  s = {credential['s']}")
 
     # 验证签名
-    messages = [PP["H"]("alice", ZR), PP["H"]("25", ZR), PP["H"]("student", ZR)]
+    messages = [hash_to_zr("alice"), hash_to_zr("25"), hash_to_zr("student")]
     valid = verify_bbs_signature(PP, credential, messages)
     assert valid, "签名验证失败!"
     print("  ✅ BBS+ 签名验证通过")
@@ -101,9 +98,9 @@ def test_all_blind():
     PP = issuer.PP
 
     # 用户端: 生成盲属性和 NIZK 证明
-    m1 = PP["H"]("alice", ZR)
-    m2 = PP["H"]("25", ZR)
-    m3 = PP["H"]("student", ZR)
+    m1 = hash_to_zr("alice")
+    m2 = hash_to_zr("25")
+    m3 = hash_to_zr("student")
 
     c1, proof1 = generate_nizk_proof(PP["h1"], m1)
     c2, proof2 = generate_nizk_proof(PP["h2"], m2)
@@ -140,7 +137,7 @@ def test_mixed():
     PP = issuer.PP
 
     # m2 为盲属性
-    m2 = PP["H"]("25", ZR)
+    m2 = hash_to_zr("25")
     c2, proof2 = generate_nizk_proof(PP["h2"], m2)
 
     attributes = {
@@ -157,7 +154,7 @@ def test_mixed():
     print(f"  s = {credential['s']}")
 
     # 验证签名
-    messages = [PP["H"]("alice", ZR), m2, PP["H"]("student", ZR)]
+    messages = [hash_to_zr("alice"), m2, hash_to_zr("student")]
     valid = verify_bbs_signature(PP, credential, messages)
     assert valid, "签名验证失败!"
     print("  ✅ BBS+ 签名验证通过")
@@ -174,15 +171,14 @@ def test_invalid_proof():
     PP = issuer.PP
 
     # 用真实的 m1 生成证明，但用错误的 commitment
-    m1_real = PP["H"]("alice", ZR)
-    m1_fake = PP["H"]("bob", ZR)
+    m1_real = hash_to_zr("alice")
+    m1_fake = hash_to_zr("bob")
 
     # 用 fake 值生成 commitment，但用 real 值生成证明 → 不匹配
     fake_commitment = PP["h1"] ** m1_fake
     r = group.random(ZR)
     R = PP["h1"] ** r
-    challenge_input = serialize_element(PP["h1"]) + serialize_element(fake_commitment) + serialize_element(R)
-    c = group.hash(challenge_input, ZR)
+    c = hash_challenge(PP["h1"], fake_commitment, R)
     z = r + c * m1_real  # 使用真实值计算 z，但 commitment 是 fake 的
 
     attributes = {
@@ -3,11 +3,13 @@ User 功能测试脚本（HTTP 方式）
 测试场景:
   1. 端到端认证成功（申请凭证 -> 生成DID并上链 -> 向Verifier证明）
   2. 策略不匹配导致认证失败
+  3. 以 msgpack 传输公共参数（Issuer /pp 与 Verifier /setup）
 """
 
 import socket
 import threading
 import time
+import msgpack
 import requests
 from werkzeug.serving import make_server
 
@@ -54,8 +56,9 @@ def wait_service_ready(base_url: str, timeout: float = 5.0):
 
 def setup_services(n: int = 3):
     """启动 issuer / verifier / blockchain 三个服务，并完成 verifier 初始化"""
-    # 重置并初始化 issuer
+    # 重置并初始化 issuer；verifier 的公共参数只能加载一次，每次换用新实例
     issuer_service.issuer.setup(n)
+    verifier_service.verifier = verifier_service.Verifier()
 
     # 启动服务
     issuer_port = get_free_port()
@@ -173,12 +176,58 @@ def test_user_auth_fail_policy():
         teardown_services(svc)
 
 
+def test_pp_msgpack_transfer():
+    """测试3: 以 msgpack 传输公共参数"""
+    print("\n" + "=" * 60)
+    print("测试3: 以 msgpack 传输公共参数")
+    print("=" * 60)
+
+    svc = setup_services(n=3)
+    try:
+        # Issuer 按 Accept 头返回 msgpack 编码的公共参数
+        r = requests.get(f"{svc['issuer_url']}/pp", headers={"Accept": "application/msgpack"}, timeout=3)
+        assert r.status_code == 200, f"获取公共参数失败: {r.text}"
+        assert r.headers["Content-Type"] == "application/msgpack"
+        pp_data = msgpack.unpackb(r.content, raw=False)["pp"]
+        assert pp_data == issuer_service.issuer.pp_serialized_bytes
+
+        # 换用新的 verifier 实例，以 msgpack 请求体加载公共参数
+        verifier_service.verifier = verifier_service.Verifier()
+        r = requests.post(
+            f"{svc['verifier_url']}/setup",
+            data=msgpack.packb({"pp": pp_data}, use_bin_type=True),
+            headers={"Content-Type": "application/msgpack"},
+            timeout=3,
+        )
+        assert r.status_code == 201, f"Verifier setup 失败: {r.text}"
+
+        policy = {"m1": "alice"}
+        r = requests.post(f"{svc['verifier_url']}/policy", json={"policy": policy}, timeout=3)
+        assert r.status_code == 201, f"设置策略失败: {r.text}"
+
+        user = User(
+            rid="user-003",
+            issuer_base_url=svc["issuer_url"],
+            blockchain_base_url=svc["blockchain_url"],
+            verifier_base_url=svc["verifier_url"],
+        )
+        attributes = {"m1": "alice", "m2": "22", "m3": "student"}
+        verify_result = user.authenticate(attributes=attributes, disclosed_indices={1})
+        assert verify_result["valid"] is True, f"认证应成功: {verify_result}"
+
+        print(f"  验证结果: {verify_result}")
+        print("  ✅ msgpack 公共参数可用于完整认证")
+    finally:
+        teardown_services(svc)
+
+
 if __name__ == '__main__':
     print("User 功能测试")
     print("=" * 60)
 
     test_user_auth_success()
     test_user_auth_fail_policy()
+    test_pp_msgpack_transfer()
 
     print("\n" + "=" * 60)
     print("全部测试通过 ✅")
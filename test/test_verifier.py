@@ -7,28 +7,41 @@ Verifier 功能测试脚本
   4. 策略要求的属性未披露 → 验证失败
   5. 伪造的凭证 → 配对检查失败
   6. 篡改的 Schnorr 证明 → 零知识证明验证失败
-  7. 无隐藏属性（全部公开） → 验证通过  8. 仅隐藏一个属性 → 验证通过
+  7. 无隐藏属性（全部公开） → 验证通过
+  8. 仅隐藏一个属性 → 验证通过
   9. 伪造 DID（v ≠ u^s）→ DID 验证失败
- 10. 篡改 R3 → 零知识证明验证失败"""
-
-from charm.toolbox.pairinggroup import PairingGroup, G1, G2, ZR, pair
-from src.issuer import Issuer, serialize_element
+ 10. 篡改 R3 → DID 验证失败
+ 11. 序列化形式的证明 → 验证通过
+ 12. 结构不完整或字段类型错误的证明 → 格式错误
+ 13. 批量验证 → 有效证明通过，伪造凭证被定位
+ 14. A' 为单位元的退化证明 → 验证失败
+ 15. 重复加载公共参数 → 被拒绝
+ 16. 策略要求 DID 但证明不含 DID → 验证失败；不要求时序列化形式同样可验证；DID 字段不全 → 格式错误"""
+
+from functools import lru_cache
+from charm.toolbox.pairinggroup import G1, G2, ZR, pair
+from src.issuer import group, Issuer, serialize_element, hash_challenge, hash_to_zr, multi_exp, random_zr_batch
 from src.verifier import Verifier
 
-group = PairingGroup('MNT224')
-
 
 # ==================== Proof Generation (Simulate User) ====================
 
-def generate_disclosure_proof(PP, credential, attr_values, disclosed_indices, did_u, did_v):
+# 属性名 "m0".."m64" 预先生成，按下标直接取用（m0 仅占位，使 _M_KEYS[i] == f"m{i}"）
+_M_KEYS = tuple(f"m{i}" for i in range(0, 65))
+
+
+def generate_disclosure_proof(PP, credential, attr_values, disclosed_indices, did_u=None, did_v=None, skip_abar=False,
+                              include_did=True):
     """
     模拟用户端生成 BBS+ 选择性披露证明（含 DID 证明）
 
     协议:
         1. 随机化凭证: A' = A ^ r1
         2. 计算 A_bar = A'^{-x} * B^{r1} = A'^{sk}
+           其中 B^{r1} = B_D^{r1} * h0^{s*r1} * Π_{i∈H} h_i^{m_i*r1}，不单独计算 B
         3. Schnorr + Fiat-Shamir 证明知道 x, r1, s*r1, {m_i*r1}_{i∈H}
         4. DID 证明: R3 = u^{k_s}, z_s = k_s + c*s，证明 v=u^s 中的 s 与凭证一致
+           （include_did=False 时省略，挑战值为 c = H(A' || A_bar || T)）
 
     Args:
         PP: 公共参数
@@ -37,6 +50,11 @@ def generate_disclosure_proof(PP, credential, attr_values, disclosed_indices, di
         disclosed_indices: set of int, e.g., {1, 3} — 要披露的属性索引
         did_u: G1 — DID 中的 u
         did_v: G1 — DID 中的 v = u^s
+        skip_abar: 为 True 时 A_bar 直接取随机元素，省去一次 multi_exp。
+            A_bar 参与 Schnorr 与配对检查，只能用于在二者之前就失败的负面测试:
+            测试3、4（策略检查）与测试9、10（DID 检查）
+        include_did: 为 False 时不生成 DID 证明，结果中不含 did_u / did_v / R3 / z_s。
+            用于不涉及 DID 的测试1、2、7、8（Verifier 策略需设置 require_did=False）
     Returns:
         proof dict
     """
@@ -44,91 +62,92 @@ def generate_disclosure_proof(PP, credential, attr_values, disclosed_indices, di
     x = credential["x"]
     s = credential["s"]
     n = PP["n"]
+    h = PP["h"]  # [h0, h1, ..., hn]
 
-    # 将所有属性哈希到 ZR
-    messages = {}
-    for i in range(1, n + 1):
-        messages[i] = PP["H"](attr_values[f"m{i}"], ZR)
+    # 将所有属性哈希到 ZR（hash_to_zr 按字符串缓存，重复的属性值不再重新哈希）
+    m_keys = _M_KEYS if n < len(_M_KEYS) else tuple(f"m{i}" for i in range(0, n + 1))
+    messages = {i: hash_to_zr(attr_values[m_keys[i]]) for i in range(1, n + 1)}
 
     hidden_indices = set(range(1, n + 1)) - disclosed_indices
+    hidden_order = sorted(hidden_indices)
 
     # Step 1: 随机化凭证
     r1 = group.random(ZR)
     A_prime = A ** r1
+    # A'^{-1} 只求逆一次，A_bar 与 T 中 A' 的负指数改为以 A'^{-1} 为底的正指数
+    A_prime_inv = A_prime ** -1
 
-    # B = g1 * h0^s * Π h_i^m_i
-    B = PP["g1"] * (PP["h0"] ** s)
-    for i in range(1, n + 1):
-        B = B * (PP[f"h{i}"] ** messages[i])
+    # B_D = g1 * Π_{j∈D} h_j^m_j
+    B_D = PP["g1"]
+    if disclosed_indices:
+        B_D = B_D * multi_exp([h[j] for j in disclosed_indices], [messages[j] for j in disclosed_indices])
 
-    # A_bar = A'^{-x} * B^{r1} = A'^{sk}
-    A_bar = (A_prime ** (-x)) * (B ** r1)
+    # A_bar 与 T 使用同一组底数 [A'^{-1}, B_D, h0, h_i (i∈H)]
+    bases = [A_prime_inv, B_D, h[0]] + [h[i] for i in hidden_order]
 
-    # 秘密值
-    s_prime = s * r1
-    m_primes = {i: messages[i] * r1 for i in hidden_indices}
+    # A_bar = A'^{-x} * B_D^{r1} * h0^{s*r1} * Π_{i∈H} h_i^{m_i*r1} = A'^{-x} * B^{r1} = A'^{sk}
+    if skip_abar:
+        A_bar = group.random(G1)
+    else:
+        A_bar = multi_exp(bases, [x, r1, s * r1] + [messages[i] * r1 for i in hidden_order])
 
     # Step 2: Schnorr 承诺
-    k_x = group.random(ZR)
-    k_r1 = group.random(ZR)
-    k_s_prime = group.random(ZR)
-    k_s = group.random(ZR)  # DID 证明用
-    k_m_primes = {i: group.random(ZR) for i in hidden_indices}
-
-    # B_D = g1 * Π_{j∈D} h_j^m_j
-    B_D = PP["g1"]
-    for j in disclosed_indices:
-        B_D = B_D * (PP[f"h{j}"] ** messages[j])
+    k_x, k_r1, k_s_prime, k_s, *k_hidden = random_zr_batch(4 + len(hidden_order))  # k_s: DID 证明用
+    k_m_primes = dict(zip(hidden_order, k_hidden))
 
     # T = A'^{-k_x} * B_D^{k_r1} * h0^{k_s'} * Π_{i∈H} h_i^{k_{m_i'}}
-    T = (A_prime ** (-k_x)) * (B_D ** k_r1) * (PP["h0"] ** k_s_prime)
-    for i in hidden_indices:
-        T = T * (PP[f"h{i}"] ** k_m_primes[i])
-
-    # R3 = u^{k_s}
-    R3 = did_u ** k_s
+    T = multi_exp(bases, [k_x, k_r1, k_s_prime] + [k_m_primes[i] for i in hidden_order])
 
-    # c = H(A' || A_bar || T || R3)
-    challenge_input = (serialize_element(A_prime)
-                       + serialize_element(A_bar)
-                       + serialize_element(T)
-                       + serialize_element(R3))
-    c = group.hash(challenge_input, ZR)
+    if include_did:
+        # R3 = u^{k_s}
+        R3 = did_u ** k_s
+        # c = H(A' || A_bar || T || R3)
+        c = hash_challenge(A_prime, A_bar, T, R3)
+    else:
+        # c = H(A' || A_bar || T)
+        c = hash_challenge(A_prime, A_bar, T)
 
     # 响应
     z_x = k_x + c * x
     z_r1 = k_r1 + c * r1
-    z_s_prime = k_s_prime + c * s_prime
-    z_s = k_s + c * s  # DID 响应
+    # s' = s * r1、m_i' = m_i * r1 不单独计算，c * r1 只算一次后折叠进响应
+    c_r1 = c * r1
+    z_s_prime = k_s_prime + c_r1 * s
     z_hidden = {}
     for i in hidden_indices:
-        z_hidden[f"m{i}"] = k_m_primes[i] + c * m_primes[i]
+        z_hidden[m_keys[i]] = k_m_primes[i] + c_r1 * messages[i]
 
     # 构造公开属性
     disclosed_attrs = {}
     for j in disclosed_indices:
-        disclosed_attrs[f"m{j}"] = attr_values[f"m{j}"]
+        disclosed_attrs[m_keys[j]] = attr_values[m_keys[j]]
 
-    return {
+    proof = {
         "disclosed_attrs": disclosed_attrs,
-        "did_u": did_u,
-        "did_v": did_v,
         "A_prime": A_prime,
         "A_bar": A_bar,
         "c": c,
         "z_x": z_x,
         "z_r1": z_r1,
         "z_s_prime": z_s_prime,
-        "z_s": z_s,
-        "R3": R3,
         "z_hidden": z_hidden,
     }
+    if include_did:
+        proof["did_u"] = did_u
+        proof["did_v"] = did_v
+        proof["z_s"] = k_s + c * s  # DID 响应
+        proof["R3"] = R3
+    return proof
 
 
 # ==================== Helper ====================
 
+@lru_cache(maxsize=None)
 def setup_issuer_and_verifier(n=4):
-    """创建 Issuer 和 Verifier，共享公共参数"""
+    """
+    创建 Issuer 和 Verifier，共享公共参数
+    按 n 缓存: 同一 n 的测试复用同一组实例，各测试自行设置访问策略
+    """
     issuer = Issuer()
     issuer.setup(n=n)
     PP = issuer.PP
@@ -147,10 +166,14 @@ def issue_credential(issuer, attr_values):
     return issuer.issue(attributes)
 
 
+# 各测试共用的 DID 底 u（测试不依赖 DID 之间互不相同；需要独立 u 的测试自行生成）
+_DID_U = group.random(G1)
+
+
 def generate_did(credential):
     """从凭证生成 DID (u, v)，其中 v = u^s"""
     s = credential["s"]
-    u = group.random(G1)
+    u = _DID_U
     v = u ** s
     return u, v
 
@@ -170,13 +193,10 @@ def test_full_disclosure_policy_match():
     assert credential is not None
 
     # 策略要求所有属性
-    verifier.set_policy({"m1": "alice", "m2": "25", "m3": "student"})
-
-    # 生成 DID
-    did_u, did_v = generate_did(credential)
+    verifier.set_policy({"m1": "alice", "m2": "25", "m3": "student"}, require_did=False)
 
     # 全部披露
-    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 2, 3}, did_u, did_v)
+    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 2, 3}, include_did=False)
     result = verifier.verify(proof)
 
     assert result["valid"], f"验证应通过: {result['message']}"
@@ -197,13 +217,10 @@ def test_partial_disclosure_policy_match():
     assert credential is not None
 
     # 策略只要求 m1 和 m3
-    verifier.set_policy({"m1": "100", "m3": "105"})
-
-    # 生成 DID
-    did_u, did_v = generate_did(credential)
+    verifier.set_policy({"m1": "100", "m3": "105"}, require_did=False)
 
     # 披露 m1, m3; 隐藏 m2, m4
-    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 3}, did_u, did_v)
+    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 3}, include_did=False)
     result = verifier.verify(proof)
 
     assert result["valid"], f"验证应通过: {result['message']}"
@@ -231,7 +248,7 @@ def test_policy_value_mismatch():
     verifier.set_policy({"m1": "bob"})
 
     did_u, did_v = generate_did(credential)
-    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 2, 3}, did_u, did_v)
+    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 2, 3}, did_u, did_v, skip_abar=True)
     result = verifier.verify(proof)
 
     assert not result["valid"], "验证应失败"
@@ -259,7 +276,7 @@ def test_policy_attr_not_disclosed():
     did_u, did_v = generate_did(credential)
 
     # 但只披露 m1, m3（不包含 m2）
-    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 3}, did_u, did_v)
+    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 3}, did_u, did_v, skip_abar=True)
     result = verifier.verify(proof)
 
     assert not result["valid"], "验证应失败"
@@ -337,10 +354,9 @@ def test_all_disclosed_no_hidden():
     credential = issue_credential(issuer, attr_values)
     assert credential is not None
 
-    verifier.set_policy({"m1": "100", "m2": "200"})
+    verifier.set_policy({"m1": "100", "m2": "200"}, require_did=False)
 
-    did_u, did_v = generate_did(credential)
-    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 2}, did_u, did_v)
+    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 2}, include_did=False)
 
     assert len(proof["z_hidden"]) == 0, "z_hidden 应为空"
 
@@ -364,13 +380,10 @@ def test_single_hidden_attribute():
     assert credential is not None
 
     # 策略只要求 m1 和 m3
-    verifier.set_policy({"m1": "alice", "m3": "student"})
-
-    # 生成 DID
-    did_u, did_v = generate_did(credential)
+    verifier.set_policy({"m1": "alice", "m3": "student"}, require_did=False)
 
     # 披露 m1, m3; 隐藏 m2
-    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 3}, did_u, did_v)
+    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 3}, include_did=False)
     result = verifier.verify(proof)
 
     assert result["valid"], f"验证应通过: {result['message']}"
@@ -399,7 +412,7 @@ def test_did_wrong_v():
     fake_s = group.random(ZR)
     v = u ** fake_s
 
-    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 2, 3}, u, v)
+    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 2, 3}, u, v, skip_abar=True)
     result = verifier.verify(proof)
 
     assert not result["valid"], "验证应失败"
@@ -409,7 +422,7 @@ def test_did_wrong_v():
 
 
 def test_did_tampered_R3():
-    """测试10: 篡改 R3 → 零知识证明验证失败"""
+    """测试10: 篡改 R3 → DID 验证失败（R3 * v^c ≠ u^{z_s}）"""
     print("\n" + "=" * 60)
     print("测试10: 篡改 R3")
     print("=" * 60)
@@ -423,31 +436,238 @@ def test_did_tampered_R3():
     verifier.set_policy({"m1": "alice"})
 
     did_u, did_v = generate_did(credential)
-    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 2, 3}, did_u, did_v)
+    proof = generate_disclosure_proof(PP, credential, attr_values, {1, 2, 3}, did_u, did_v, skip_abar=True)
 
     # 篡改 R3
     proof["R3"] = group.random(G1)
     result = verifier.verify(proof)
 
     assert not result["valid"], "验证应失败"
+    assert "DID" in result["message"]
     print(f"  结果: {result['message']}")
     print("  ✅ 篡改 R3 被正确拒绝")
 
 
+def test_verify_serialized_proof():
+    """测试11: 序列化形式的证明（/verify 请求体格式）"""
+    print("\n" + "=" * 60)
+    print("测试11: 序列化形式的证明")
+    print("=" * 60)
+
+    issuer, verifier, PP = setup_issuer_and_verifier(n=3)
+
+    attr_values = {"m1": "alice", "m2": "25", "m3": "student"}
+    credential = issue_credential(issuer, attr_values)
+    assert credential is not None
+
+    verifier.set_policy({"m1": "alice"})
+
+    did_u, did_v = generate_did(credential)
+    proof = generate_disclosure_proof(PP, credential, attr_values, {1}, did_u, did_v)
+
+    # 按 /verify 请求体格式序列化
+    data = {"disclosed_attrs": proof["disclosed_attrs"]}
+    for key in ("did_u", "did_v", "A_prime", "A_bar", "c", "z_x", "z_r1", "z_s_prime", "z_s", "R3"):
+        data[key] = serialize_element(proof[key])
+    data["z_hidden"] = {k: serialize_element(v) for k, v in proof["z_hidden"].items()}
+
+    result = verifier.verify_serialized(data)
+    assert result["valid"], f"验证应通过: {result['message']}"
+    print(f"  结果: {result['message']}")
+    print("  ✅ 序列化证明验证通过")
+
+
+def test_malformed_proof():
+    """测试12: 结构不完整或字段类型错误的证明 → 在任何群幂运算之前被拒绝"""
+    print("\n" + "=" * 60)
+    print("测试12: 结构不完整的证明")
+    print("=" * 60)
+
+    issuer, verifier, PP = setup_issuer_and_verifier(n=3)
+
+    attr_values = {"m1": "alice", "m2": "25", "m3": "student"}
+    credential = issue_credential(issuer, attr_values)
+    assert credential is not None
+
+    verifier.set_policy({"m1": "alice"})
+
+    did_u, did_v = generate_did(credential)
+    proof = generate_disclosure_proof(PP, credential, attr_values, {1}, did_u, did_v)
+
+    # 删除一个隐藏属性的响应
+    del proof["z_hidden"]["m2"]
+    result = verifier.verify(proof)
+
+    assert not result["valid"], "验证应失败"
+    assert "格式错误" in result["message"]
+    print(f"  结果: {result['message']}")
+
+    # A_bar 换成 ZR 元素（类型错误）
+    proof = generate_disclosure_proof(PP, credential, attr_values, {1}, did_u, did_v)
+    proof["A_bar"] = group.random(ZR)
+    result = verifier.verify(proof)
+
+    assert not result["valid"], "验证应失败"
+    assert "格式错误" in result["message"]
+    print(f"  结果: {result['message']}")
+    print("  ✅ 结构不完整或类型错误的证明被正确拒绝")
+
+
+def test_verify_batch():
+    """测试13: 批量验证 — 有效证明通过，伪造凭证被单独定位"""
+    print("\n" + "=" * 60)
+    print("测试13: 批量验证")
+    print("=" * 60)
+
+    issuer, verifier, PP = setup_issuer_and_verifier(n=3)
+
+    attr_values = {"m1": "alice", "m2": "25", "m3": "student"}
+    verifier.set_policy({"m1": "alice"})
+
+    proofs = []
+    for disclosed in ({1}, {1, 2}, {1, 3}):
+        credential = issue_credential(issuer, attr_values)
+        did_u, did_v = generate_did(credential)
+        proofs.append(generate_disclosure_proof(PP, credential, attr_values, disclosed, did_u, did_v))
+
+    results = verifier.verify_batch(proofs)
+    assert all(r["valid"] for r in results), f"批量验证应全部通过: {results}"
+    print("  ✅ 有效证明批量验证通过")
+
+    # 用随机 A 伪造第二个凭证
+    forged = dict(issue_credential(issuer, attr_values))
+    forged["A"] = group.random(G1)
+    did_u, did_v = generate_did(forged)
+    proofs[1] = generate_disclosure_proof(PP, forged, attr_values, {1}, did_u, did_v)
+
+    results = verifier.verify_batch(proofs)
+    assert [r["valid"] for r in results] == [True, False, True], f"应只有伪造证明失败: {results}"
+    print(f"  结果: {results[1]['message']}")
+    print("  ✅ 伪造凭证在批量验证中被正确定位")
+
+    # 无法处理的证明（非字典）只影响自身，其余证明照常验证
+    results = verifier.verify_batch([proofs[0], None, proofs[2]])
+    assert [r["valid"] for r in results] == [True, False, True], f"应只有出错的证明失败: {results}"
+    print(f"  结果: {results[1]['message']}")
+    print("  ✅ 出错的证明不影响批量中的其他证明")
+
+
+def test_identity_A_prime():
+    """测试14: A' = A_bar = 单位元的退化证明 → 被拒绝"""
+    print("\n" + "=" * 60)
+    print("测试14: 退化证明（A' 为单位元）")
+    print("=" * 60)
+
+    issuer, verifier, PP = setup_issuer_and_verifier(n=3)
+
+    attr_values = {"m1": "alice", "m2": "25", "m3": "student"}
+    credential = issue_credential(issuer, attr_values)
+    assert credential is not None
+
+    verifier.set_policy({"m1": "alice"})
+
+    did_u, did_v = generate_did(credential)
+    proof = generate_disclosure_proof(PP, credential, attr_values, {1}, did_u, did_v)
+
+    identity = PP["g1"] ** group.init(ZR, 0)
+    proof["A_prime"] = identity
+    proof["A_bar"] = identity
+    result = verifier.verify(proof)
+
+    assert not result["valid"], "验证应失败"
+    print(f"  结果: {result['message']}")
+    print("  ✅ 退化证明被正确拒绝")
+
+
+def test_setup_only_once():
+    """测试15: 公共参数只能加载一次"""
+    print("\n" + "=" * 60)
+    print("测试15: 重复加载公共参数")
+    print("=" * 60)
+
+    issuer, verifier, PP = setup_issuer_and_verifier(n=2)
+
+    try:
+        verifier.setup(PP)
+    except RuntimeError as e:
+        print(f"  结果: {e}")
+    else:
+        assert False, "重复加载应失败"
+    print("  ✅ 重复加载被正确拒绝")
+
+
+def test_did_required_but_missing():
+    """测试16: 不含 DID 的证明 — 策略要求 DID 时被拒绝"""
+    print("\n" + "=" * 60)
+    print("测试16: 策略要求 DID，证明不含 DID")
+    print("=" * 60)
+
+    issuer, verifier, PP = setup_issuer_and_verifier(n=3)
+
+    attr_values = {"m1": "alice", "m2": "25", "m3": "student"}
+    credential = issue_credential(issuer, attr_values)
+    assert credential is not None
+
+    proof = generate_disclosure_proof(PP, credential, attr_values, {1}, include_did=False)
+
+    verifier.set_policy({"m1": "alice"})
+    result = verifier.verify(proof)
+    assert not result["valid"], "验证应失败"
+    assert "DID" in result["message"]
+    print(f"  结果: {result['message']}")
+
+    # 策略不要求 DID 时，同一证明的序列化形式可以通过验证
+    verifier.set_policy({"m1": "alice"}, require_did=False)
+    data = {"disclosed_attrs": proof["disclosed_attrs"]}
+    for key in ("A_prime", "A_bar", "c", "z_x", "z_r1", "z_s_prime"):
+        data[key] = serialize_element(proof[key])
+    data["z_hidden"] = {k: serialize_element(v) for k, v in proof["z_hidden"].items()}
+    result = verifier.verify_serialized(data)
+    assert result["valid"], f"验证应通过: {result['message']}"
+
+    # 只带部分 DID 字段（缺少 R3）的证明即使策略不要求 DID 也应被拒绝
+    did_u, did_v = generate_did(credential)
+    partial = generate_disclosure_proof(PP, credential, attr_values, {1}, did_u, did_v)
+    del partial["R3"]
+    result = verifier.verify(partial)
+    assert not result["valid"], "验证应失败"
+    assert "格式错误" in result["message"]
+    print(f"  结果: {result['message']}")
+    print("  ✅ 缺少 DID 或 DID 字段不全的证明被正确拒绝")
+
+
 if __name__ == '__main__':
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
     print("Verifier 功能测试")
     print("=" * 60)
 
-    test_full_disclosure_policy_match()
-    test_partial_disclosure_policy_match()
-    test_policy_value_mismatch()
-    test_policy_attr_not_disclosed()
-    test_forged_credential()
-    test_tampered_schnorr_proof()
-    test_all_disclosed_no_hidden()
-    test_single_hidden_attribute()
-    test_did_wrong_v()
-    test_did_tampered_R3()
+    tests = [
+        test_full_disclosure_policy_match,
+        test_partial_disclosure_policy_match,
+        test_policy_value_mismatch,
+        test_policy_attr_not_disclosed,
+        test_forged_credential,
+        test_tampered_schnorr_proof,
+        test_all_disclosed_no_hidden,
+        test_single_hidden_attribute,
+        test_did_wrong_v,
+        test_did_tampered_R3,
+        test_verify_serialized_proof,
+        test_malformed_proof,
+        test_verify_batch,
+        test_identity_A_prime,
+        test_setup_only_once,
+        test_did_required_but_missing,
+    ]
+
+    # 各测试相互独立，分发到多个进程并行执行；
+    # charm 的 PairingGroup 不保证 fork 安全，使用 spawn 让每个子进程重新初始化 group
+    with ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(test) for test in tests]
+        for future in as_completed(futures):
+            future.result()  # 子进程中的断言失败在此重新抛出
 
     print("\n" + "=" * 60)
     print("全部测试通过 ✅")